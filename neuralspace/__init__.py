@@ -1,8 +1,52 @@
+from neuralspace import audio
 from neuralspace.version import version
 from neuralspace.voice_ai import VoiceAI
+from neuralspace.async_voice_ai import AsyncVoiceAI
+from neuralspace.bulk import TranscribeResult, AMAResult, SynthesisResult, SynthesisProgress, SynthesisBatch
+from neuralspace.watcher import JobWatcher
+from neuralspace.multipart import MultipartEncoder, UploadProgress
+from neuralspace.transport import TransportConfig
+from neuralspace.cache import CatalogCache
+from neuralspace.tokens import TokenManager
+from neuralspace.stream_pool import StreamPool
+from neuralspace.streaming import StreamTranscriber, StreamResult
+from neuralspace.silence import SilenceTrimmer, OffsetMap
+from neuralspace.dedup import Deduplicator
+from neuralspace.job_store import JobStore, JobRecord
+from neuralspace.tts import SynthesisStream
+from neuralspace.tts_cache import TTSCache
+from neuralspace.ratelimit import RateLimiter, Governor, Limit
+from neuralspace.metrics import Instrumentation, RequestInfo
 
 __version__ = version
 __all__ = [
     'VoiceAI',
+    'AsyncVoiceAI',
+    'TranscribeResult',
+    'AMAResult',
+    'SynthesisResult',
+    'SynthesisProgress',
+    'SynthesisBatch',
+    'JobWatcher',
+    'MultipartEncoder',
+    'UploadProgress',
+    'TransportConfig',
+    'CatalogCache',
+    'TokenManager',
+    'StreamPool',
+    'StreamTranscriber',
+    'StreamResult',
+    'SilenceTrimmer',
+    'OffsetMap',
+    'Deduplicator',
+    'JobStore',
+    'JobRecord',
+    'SynthesisStream',
+    'TTSCache',
+    'RateLimiter',
+    'Governor',
+    'Limit',
+    'Instrumentation',
+    'RequestInfo',
     'version',
 ]
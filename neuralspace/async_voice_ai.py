@@ -0,0 +1,404 @@
+import io
+import json
+import asyncio
+import inspect
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import Any, List, Dict, Union, Optional, Callable
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from neuralspace import utils, constants as K
+from neuralspace.transport import TransportConfig, parse_retry_after
+
+
+class AsyncVoiceAI:
+
+
+    def __init__(self, api_key=None, max_connections: int = 100, transport: Optional[TransportConfig] = None):
+        '''
+        asyncio VoiceAI instance to make transcription requests.\n
+        Every method is a coroutine backed by a non-blocking HTTP session,
+        so a single event loop can keep thousands of requests in flight.
+
+        Parameters
+        ----------
+        api_key: str, optional
+            Same resolution as `VoiceAI`.
+        max_connections: int
+            Upper limit of simultaneously open connections in the pool.\n
+            Use 0 for no limit.
+        transport: TransportConfig, optional
+            Timeout, keep-alive and retry settings. Pool sizes are ignored in
+            favor of `max_connections`.
+        '''
+        if aiohttp is None:
+            raise ImportError(
+                'AsyncVoiceAI requires aiohttp: `pip install neuralspace[async]`'
+            )
+        self._api_key = utils.resolve_api_key(api_key)
+        self._max_connections = max_connections
+        self._transport = transport if transport is not None else TransportConfig()
+        self._session = None
+        self._tasks = set()
+
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_connections,
+                force_close=not self._transport.keep_alive,
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=self._transport.connect_timeout,
+                sock_read=self._transport.read_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+
+    async def close(self):
+        '''
+        Close the underlying HTTP session.
+        '''
+        try:
+            await self._session.close()
+        except:
+            pass
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+    async def transcribe(
+        self,
+        file: Union[str, Path, bytes, io.BytesIO],
+        config: Union[Dict[str, Any], str, Path, io.IOBase],
+        on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+        on_complete_kwargs: Optional[Dict[str, Any]] = {},
+        poll_schedule: Optional[List[float]] = None,
+    ) -> str:
+        '''
+        Transcribe an audio file.\n
+        Same parameters as `VoiceAI.transcribe`.\n
+        `on_complete` may be a plain function or a coroutine function; it is
+        awaited on a background task of the running event loop.
+
+        Returns
+        -------
+        job_id: str
+            Job ID of the newly created transcription job.
+        '''
+        config = utils.resolve_config(config)
+        resp = await self._create_transcribe_job(file, config)
+        job_id = resp[K.k_data][K.k_job_id]
+        if on_complete is not None:
+            if on_complete_kwargs is None:
+                on_complete_kwargs = {}
+            task = asyncio.ensure_future(self._poll_and_call(
+                job_id,
+                on_complete=on_complete,
+                on_complete_kwargs=on_complete_kwargs,
+                poll_schedule=poll_schedule,
+            ))
+            # keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job_id
+
+
+    @asynccontextmanager
+    async def stream(self,
+                     language_id: str,
+                     min_chunk_size: Optional[int] = 1,
+                     max_chunk_size: Optional[int] = 5,
+                     vad_threshold: Optional[float] = 0.5,
+                     vad_min_silence: Optional[float] = 0.1,
+                     disable_partial: Optional[bool] = False,
+                     audio_format: Optional[str] = 'pcm_16k',
+                     timeout: Optional[float] = None,
+                     noise_level: Optional[float] = 0.0):
+        '''
+        Streaming real-time transcription.\n
+        Async context manager that returns an `aiohttp` websocket connection.
+        ```
+        async with vai.stream('en') as ws:
+            await ws.send_bytes(...)
+            await ws.receive_str()
+        ```
+        Same parameters as `VoiceAI.stream`.
+        '''
+        if timeout is None:
+            timeout = K.timeout
+        token = await self._get_short_lived_token(timeout)
+        url = utils.stream_url(
+            language_id,
+            token,
+            min_chunk_size=min_chunk_size,
+            max_chunk_size=max_chunk_size,
+            vad_threshold=vad_threshold,
+            vad_min_silence=vad_min_silence,
+            disable_partial=disable_partial,
+            audio_format=audio_format,
+            noise_level=noise_level,
+        )
+        sess = self._get_session()
+        ws = await sess.ws_connect(url, receive_timeout=timeout)
+        try:
+            yield ws
+        finally:
+            await ws.close()
+
+
+    async def languages(self, type: str) -> List[str]:
+        '''
+        Get supported languages based on transcription type.
+
+        Parameters
+        ----------
+        type: str
+            Transcription type. `file` or `stream`
+
+        Returns
+        -------
+        languages: List[str]
+            List of language codes
+        '''
+        resp = await self._request('GET', utils.langs_url(type))
+        langs = resp[K.k_data][K.k_langs]
+        return langs
+
+
+    async def voices(self) -> List[Dict[str, Any]]:
+        '''
+        Get supported voices for TTS
+
+        Returns
+        -------
+        voices: List[Dict[str, Any]
+            List of voices along with metadata
+        '''
+        resp = await self._request('GET', K.FULL_VOICES_URL)
+        voices = resp[K.k_data]
+        return voices
+
+
+    async def get_job_status(self, job_id: str) -> Dict[str, Any]:
+        '''
+        Get status of a transcription job
+
+        Parameters
+        ----------
+        job_id: str
+            The id of the transcription job
+
+        Returns
+        -------
+        result: dict
+            The current status of the job.
+        '''
+        return await self._request('GET', utils.job_url(job_id))
+
+
+    async def poll_until_complete(self, job_id: str, poll_schedule: Optional[List[float]] = None):
+        '''
+        Poll the status and wait till the job completes.\n
+        Sleeps with `asyncio.sleep`, so it does not block the event loop.
+        '''
+        result = None
+        for dur in utils.iter_poll_schedule(poll_schedule):
+            result = await self.get_job_status(job_id)
+            if utils.is_completed(result):
+                break
+            await asyncio.sleep(dur)
+        return result
+
+
+    async def ama(self, job_id: str, prompts: List[str]) -> Dict[str, Any]:
+        '''
+        Create and send a request for an AMA job.
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID for the transcript on which to run AMA.
+        prompts: List[str]
+            List of prompts for the AMA.
+
+        Returns
+        -------
+        result: dict
+            The response from the server.
+        '''
+        data = {
+            "jobId": job_id,
+            "prompts": prompts
+        }
+        return await self._request('POST', K.FULL_AMA_URL.rstrip('/'), json=data)
+
+
+    async def synthesize(
+            self,
+            data: Union[Dict[str, Any], str, Path, io.IOBase],
+            ):
+        '''
+        Text to speech.\n
+        Returns audio bytes when `data['stream']` is True, the job details otherwise.
+        '''
+        data = utils.resolve_config(data)
+        if data['stream'] == False:
+            return await self._request('POST', K.FULL_TTS_URL, json=data)
+        if data['stream'] == True:
+            return await self._request('POST', K.FULL_TTS_URL, json=data, read=_read_body)
+
+
+    async def get_tts_job_status(self, job_id: str) -> Dict[str, Any]:
+        return await self._request('GET', utils.tts_job_url(job_id))
+
+
+    async def get_tts_jobs(self, query_params: Union[Dict[str, Any], str, Path, io.IOBase]) -> Dict[str, Any]:
+        query_params = utils.resolve_config(query_params)
+        return await self._request('GET', utils.tts_job_url(), params=query_params)
+
+
+    async def delete_tts_job(self, job_id: str) -> Dict[str, Any]:
+        return await self._request('DELETE', utils.tts_job_url(job_id))
+
+
+    async def create_custom_dict(self, name: str, words: List[str]) -> Dict[str, Any]:
+        '''
+        Create a dictionary of custom words for vocab adaptation.\n
+        See `VoiceAI.create_custom_dict`.
+        '''
+        data = {
+            "name": name,
+            "words": words
+        }
+        return await self._request('POST', utils.dict_url(), json=data)
+
+
+    async def get_custom_dicts(self) -> Dict[str, Any]:
+        '''
+        Fetch a list of all custom dictionaries created by the user.
+        '''
+        return await self._request('GET', utils.dict_url())
+
+
+    async def get_custom_dict(self, dict_id: str) -> Dict[str, Any]:
+        '''
+        Fetch the details of a custom dictionary.
+        '''
+        return await self._request('GET', utils.dict_url(dict_id))
+
+
+    async def update_custom_dict(self, dict_id: str, op: str, words: List[str]) -> Dict[str, Any]:
+        '''
+        Update the words in custom dictionary.\n
+        See `VoiceAI.update_custom_dict`.
+        '''
+        data = {
+            "op": op,
+            "words": words
+        }
+        return await self._request('PATCH', utils.dict_url(dict_id), json=data)
+
+
+    async def _get_short_lived_token(self, timeout):
+        resp = await self._request('GET', utils.token_url(timeout))
+        token = resp[K.k_data][K.k_token]
+        return token
+
+
+    async def _poll_and_call(self, job_id, on_complete=None, on_complete_kwargs={}, poll_schedule=None):
+        result = await self.poll_until_complete(job_id, poll_schedule=poll_schedule)
+        res = on_complete(result, **on_complete_kwargs)
+        if inspect.isawaitable(res):
+            await res
+
+
+    async def _create_transcribe_job(self, file, job_config):
+        name, content, content_type = utils.create_formdata_file(file)
+        start = None
+        if isinstance(content, io.IOBase) and content.seekable():
+            start = content.tell()
+
+        def make_form():
+            # FormData can only be sent once, so every attempt builds a new one
+            if start is not None:
+                content.seek(start)
+            form = aiohttp.FormData()
+            form.add_field(K.k_config, json.dumps(job_config))
+            form.add_field(K.k_files, content, filename=name, content_type=content_type)
+            return form
+
+        rewindable = start is not None or not isinstance(content, io.IOBase)
+        try:
+            return await self._request('POST', K.FULL_JOBS_URL, make_data=make_form, retry=rewindable)
+        finally:
+            if isinstance(file, (str, Path)):
+                content.close()
+
+
+    async def _request(self, method, url, make_data=None, retry=True, read=None, **kwargs):
+        '''
+        Sends a request with the retry policy of the transport config and
+        returns the result of `read(response)`, the JSON body by default.
+        '''
+        if read is None:
+            read = _get_json_resp
+        config = self._transport
+        sess = self._get_session()
+        hdrs = utils.create_headers(self._api_key)
+        attempt = 0
+        while True:
+            if make_data is not None:
+                kwargs['data'] = make_data()
+            can_retry = retry and attempt < config.max_retries
+            try:
+                async with sess.request(method, url, headers=hdrs, **kwargs) as r:
+                    if not can_retry or not config.should_retry_status(method, r.status):
+                        return await read(r)
+                    retry_after = parse_retry_after(r.headers.get('Retry-After'))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                connect_failed = _is_connect_error(e)
+                if not can_retry or not config.should_retry_error(method, connect_failed):
+                    raise
+                retry_after = None
+            await asyncio.sleep(config.backoff(attempt, retry_after))
+            attempt += 1
+
+
+def _is_connect_error(e):
+    '''
+    Whether the request never reached the server, so that even a POST can be
+    sent again. Read timeouts (`SocketTimeoutError`) do not count: the server
+    may already be handling the request.
+    '''
+    # ConnectionTimeoutError is only raised by aiohttp >= 3.10, older
+    # versions raise a bare ServerTimeoutError for connect and read timeouts alike
+    connect_timeout = getattr(aiohttp, 'ConnectionTimeoutError', None)
+    if connect_timeout is not None and isinstance(e, connect_timeout):
+        return True
+    return isinstance(e, aiohttp.ClientConnectorError)
+
+
+async def _get_json_resp(r):
+    if r.status == 200 and \
+            r.headers.get('Content-type', '').startswith('application/json'):
+        return await r.json()
+    raise ValueError(f'{r.status}: {await r.text()}')
+
+
+async def _read_body(r):
+    if r.status != 200:
+        # never return an error response as audio
+        raise ValueError(f'{r.status}: {await r.text()}')
+    return await r.read()
@@ -0,0 +1,275 @@
+import io
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# sample rate of each streaming `audio_format`
+AUDIO_FORMATS = {
+    'pcm_16k': 16000,
+    'pcm_8k': 8000,
+}
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            'Audio preparation requires numpy: `pip install neuralspace[audio]`'
+        )
+
+
+def _read_bytes(source):
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as fp:
+            return fp.read()
+    if isinstance(source, io.IOBase):
+        return source.read()
+    return memoryview(source).cast('B')
+
+
+def read_wav(source):
+    '''
+    Decode a WAV file into samples.
+
+    Parameters
+    ----------
+    source: str, Path, bytes, memoryview, or binary file object
+        WAV data. Buffers are decoded without copying.
+
+    Returns
+    -------
+    samples: np.ndarray
+        Shape `(frames, channels)`. 16 and 32-bit PCM keep their integer
+        dtype, 8 and 24-bit PCM are widened to int16 and int32, and IEEE
+        float stays float.
+    rate: int
+        Sample rate in Hz.
+    '''
+    _require_numpy()
+    buf = memoryview(_read_bytes(source)).cast('B')
+    if bytes(buf[:4]) != b'RIFF' or bytes(buf[8:12]) != b'WAVE':
+        raise ValueError('Not a RIFF/WAVE file')
+
+    fmt = None
+    data = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = int.from_bytes(buf[pos + 4:pos + 8], 'little')
+        body = buf[pos + 8:pos + 8 + size]
+        if chunk_id == b'fmt ':
+            fmt = body
+        elif chunk_id == b'data':
+            data = body
+            break
+        # chunks are padded to an even size
+        pos += 8 + size + (size & 1)
+    if fmt is None or data is None:
+        raise ValueError('WAV file without fmt or data chunk')
+
+    tag = int.from_bytes(fmt[0:2], 'little')
+    channels = int.from_bytes(fmt[2:4], 'little')
+    rate = int.from_bytes(fmt[4:8], 'little')
+    bits = int.from_bytes(fmt[14:16], 'little')
+    if tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        tag = int.from_bytes(fmt[24:26], 'little')
+
+    width = bits // 8
+    usable = len(data) - len(data) % (width * channels)
+    data = data[:usable]
+    if tag == _WAVE_FORMAT_PCM:
+        if bits == 8:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.int16) - 128) << 8
+        elif bits == 16:
+            samples = np.frombuffer(data, dtype='<i2')
+        elif bits == 24:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            samples = (raw[:, 0] << 8 | raw[:, 1] << 16 | raw[:, 2] << 24)
+        elif bits == 32:
+            samples = np.frombuffer(data, dtype='<i4')
+        else:
+            raise ValueError(f'Unsupported PCM bit depth: {bits}')
+    elif tag == _WAVE_FORMAT_IEEE_FLOAT:
+        if bits == 32:
+            samples = np.frombuffer(data, dtype='<f4')
+        elif bits == 64:
+            samples = np.frombuffer(data, dtype='<f8')
+        else:
+            raise ValueError(f'Unsupported float bit depth: {bits}')
+    else:
+        raise ValueError(f'Unsupported WAV format tag: {tag}')
+    return samples.reshape(-1, channels), rate
+
+
+def read_raw(source, rate: int, channels: int = 1, dtype: str = '<i2'):
+    '''
+    Interpret headerless PCM data, e.g. `.raw` or `.pcm` files.\n
+    Returns `(samples, rate)` like `read_wav`. Buffers are not copied.
+    '''
+    _require_numpy()
+    dtype = np.dtype(dtype)
+    buf = memoryview(_read_bytes(source)).cast('B')
+    usable = len(buf) - len(buf) % (dtype.itemsize * channels)
+    samples = np.frombuffer(buf[:usable], dtype=dtype)
+    return samples.reshape(-1, channels), rate
+
+
+def downmix(samples):
+    '''
+    Average all channels into one. Returns float32 of shape `(frames,)`,
+    scaled to [-1, 1] for integer input.
+    '''
+    _require_numpy()
+    x = to_float(samples)
+    if x.ndim == 1:
+        return x
+    if x.shape[1] == 1:
+        return x[:, 0]
+    return x.mean(axis=1, dtype=np.float32)
+
+
+def to_float(samples):
+    '''
+    Convert samples to float32 in [-1, 1].
+    '''
+    _require_numpy()
+    if samples.dtype.kind == 'f':
+        return samples.astype(np.float32, copy=False)
+    scale = float(2 ** (8 * samples.dtype.itemsize - 1))
+    return samples.astype(np.float32) / scale
+
+
+def to_int16(samples):
+    '''
+    Convert float samples in [-1, 1] to little-endian int16, clipping overflows.
+    '''
+    _require_numpy()
+    if samples.dtype == np.dtype('<i2'):
+        return samples
+    x = to_float(samples)
+    return np.clip(np.rint(x * 32767.0), -32768, 32767).astype('<i2')
+
+
+def _lowpass(x, cutoff, taps=63):
+    '''
+    Windowed-sinc FIR low-pass; `cutoff` is a fraction of the Nyquist frequency.
+    '''
+    n = np.arange(taps) - (taps - 1) / 2
+    h = cutoff * np.sinc(cutoff * n) * np.blackman(taps)
+    h /= h.sum()
+    # mode='same' returns max(len(x), taps) samples, centred on the longer
+    # input; take the len(x) samples aligned with x instead
+    y = np.convolve(x, h.astype(np.float32), mode='full')
+    start = (taps - 1) // 2
+    return y[start:start + len(x)]
+
+
+def resample(x, src_rate: int, dst_rate: int):
+    '''
+    Resample mono float samples from `src_rate` to `dst_rate`.\n
+    Downsampling low-pass filters first to avoid aliasing. Integer ratios
+    decimate directly, other ratios interpolate linearly.
+    '''
+    _require_numpy()
+    if src_rate == dst_rate or len(x) == 0:
+        return x
+    if dst_rate < src_rate:
+        x = _lowpass(x, dst_rate / src_rate)
+        if src_rate % dst_rate == 0:
+            return x[::src_rate // dst_rate]
+    n = int(round(len(x) * dst_rate / src_rate))
+    t = np.arange(n, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(t, np.arange(len(x)), x).astype(np.float32)
+
+
+def prepare(samples, rate: int, audio_format: str = 'pcm_16k'):
+    '''
+    Downmix, resample and convert samples to the int16 mono PCM expected by
+    `VoiceAI.stream()` for `audio_format`.
+
+    Returns
+    -------
+    pcm: np.ndarray
+        int16 samples at the rate of `audio_format`.
+    '''
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f'Unsupported audio_format: {audio_format}')
+    dst_rate = AUDIO_FORMATS[audio_format]
+    # already in the target format, nothing to compute
+    if rate == dst_rate and samples.dtype == np.dtype('<i2') and \
+            (samples.ndim == 1 or samples.shape[1] == 1):
+        return samples.reshape(-1)
+    x = downmix(samples)
+    x = resample(x, rate, dst_rate)
+    return to_int16(x)
+
+
+def frames(pcm, audio_format: str = 'pcm_16k', frame_duration: float = 0.1):
+    '''
+    Split int16 PCM into `frame_duration` second frames.\n
+    Yields `memoryview` slices of `pcm`'s buffer, so no audio is copied.
+    The last frame may be shorter.
+    '''
+    rate = AUDIO_FORMATS[audio_format]
+    step = max(1, int(round(rate * frame_duration))) * 2
+    view = memoryview(pcm).cast('B')
+    for start in range(0, len(view), step):
+        yield view[start:start + step]
+
+
+def stream_frames(
+    source,
+    audio_format: str = 'pcm_16k',
+    frame_duration: float = None,
+    min_chunk_size: float = 1,
+    max_chunk_size: float = 5,
+    raw_rate: int = None,
+    raw_channels: int = 1,
+    raw_dtype: str = '<i2',
+):
+    '''
+    Decode a WAV or raw PCM source and frame it for `VoiceAI.stream()`,
+    in one step and without spawning ffmpeg.
+    ```
+    frames = stream_frames('call.wav', audio_format='pcm_8k')
+    with StreamTranscriber(vai, 'en', frames, audio_format='pcm_8k') as st:
+        ...
+    ```
+
+    Parameters
+    ----------
+    source: str, Path, bytes, memoryview, or binary file object
+        WAV data, or headerless PCM when `raw_rate` is given.
+    audio_format: str
+        `pcm_16k` or `pcm_8k`, as passed to `stream()`.
+    frame_duration: float, optional
+        Seconds of audio per frame. Defaults to `min_chunk_size`.
+    min_chunk_size, max_chunk_size: float
+        Chunk sizes of the stream; frames are never longer than `max_chunk_size`.
+    raw_rate, raw_channels, raw_dtype:
+        Layout of headerless PCM input. See `read_raw`.
+
+    Returns
+    -------
+    frames: Iterator[memoryview]
+        int16 mono PCM frames.
+    '''
+    if frame_duration is None:
+        frame_duration = min_chunk_size
+    if frame_duration <= 0 or frame_duration > max_chunk_size:
+        raise ValueError(
+            f'frame_duration must be in (0, max_chunk_size={max_chunk_size}], got {frame_duration}'
+        )
+    if raw_rate is not None:
+        samples, rate = read_raw(source, raw_rate, channels=raw_channels, dtype=raw_dtype)
+    else:
+        samples, rate = read_wav(source)
+    pcm = prepare(samples, rate, audio_format)
+    return frames(pcm, audio_format, frame_duration)
@@ -0,0 +1,23 @@
+'''
+Offline benchmarks of the client against a local fake VoiceAI server.\n
+Run them with `python -m neuralspace.benchmark`, or from code with `run()`.
+Requires aiohttp (`pip install neuralspace[bench]`).
+'''
+from neuralspace.benchmark.server import FakeServer
+from neuralspace.benchmark.scenarios import (
+    Report,
+    SCENARIOS,
+    run,
+    compare,
+    format_run,
+)
+
+
+__all__ = [
+    'FakeServer',
+    'Report',
+    'SCENARIOS',
+    'run',
+    'compare',
+    'format_run',
+]
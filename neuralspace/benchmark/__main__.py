@@ -0,0 +1,67 @@
+import json
+from typing import List, Optional
+
+import typer
+
+from neuralspace.benchmark.scenarios import SCENARIOS, run, format_run
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(
+    scenario: Optional[List[str]] = typer.Option(
+        None, '-s', '--scenario', help=f'Scenario to run, repeatable: {", ".join(SCENARIOS)}. Defaults to all.'
+    ),
+    latency: float = typer.Option(0.0, help='Server latency in seconds'),
+    jitter: float = typer.Option(0.0, help='Random extra server latency, up to this many seconds'),
+    error_rate: float = typer.Option(0.0, help='Fraction of requests the server fails'),
+    seed: int = typer.Option(0, help='Seed of the jitter and error injection'),
+    concurrency: int = typer.Option(16, '-c', '--concurrency', help='Client threads'),
+    files: int = typer.Option(200, help='Files uploaded by the upload scenario'),
+    file_size: int = typer.Option(256 * 1024, help='Bytes per uploaded file'),
+    jobs: int = typer.Option(50, help='Jobs polled by the poll scenario'),
+    job_duration: float = typer.Option(1.0, help='Seconds until a job completes'),
+    poll_interval: float = typer.Option(0.1, help='Seconds between polls of a job'),
+    sessions: int = typer.Option(4, help='Concurrent sessions of the stream scenario'),
+    audio_seconds: float = typer.Option(10.0, help='Seconds of audio sent per stream session'),
+    realtime: bool = typer.Option(False, help='Send stream audio at real-time pace'),
+    requests: int = typer.Option(200, help='Requests of the synthesize scenario'),
+    audio_bytes: int = typer.Option(64 * 1024, help='Bytes of audio per synthesize request'),
+    output: Optional[str] = typer.Option(None, '-o', '--output', help='Save the run as JSON to this file'),
+    baseline: Optional[str] = typer.Option(None, '-b', '--baseline', help='Compare with a run saved earlier with --output'),
+):
+    '''
+    Benchmark the client against a local fake VoiceAI server.
+    '''
+    params = {
+        'upload': dict(files=files, file_size=file_size),
+        'poll': dict(jobs=jobs, job_duration=job_duration, interval=poll_interval),
+        'stream': dict(sessions=sessions, audio_seconds=audio_seconds, realtime=realtime),
+        'synthesize': dict(requests=requests, audio_bytes=audio_bytes),
+    }
+    try:
+        result = run(
+            scenario,
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            seed=seed,
+            concurrency=concurrency,
+            params=params,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    base = None
+    if baseline is not None:
+        with open(baseline) as fp:
+            base = json.load(fp)
+    typer.echo(format_run(result, base))
+    if output is not None:
+        with open(output, 'w') as fp:
+            json.dump(result, fp, indent=2)
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,329 @@
+import sys
+import time
+import platform
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from neuralspace import utils
+from neuralspace import constants as K
+from neuralspace.version import version
+from neuralspace.voice_ai import VoiceAI
+from neuralspace.streaming import StreamTranscriber
+from neuralspace.transport import TransportConfig
+from neuralspace.benchmark.server import FakeServer
+
+
+Report = namedtuple(
+    'Report', ['scenario', 'params', 'ops', 'errors', 'seconds', 'throughput', 'unit', 'latency', 'extra']
+)
+Report.__doc__ = '''
+Outcome of one benchmark scenario.\n
+`ops` operations were run in `seconds`, `errors` of them failed, at
+`throughput` `unit`s per second. `latency` holds percentiles in seconds of
+the scenario's per-operation latency, and `extra` scenario specific numbers
+and the requests the server saw.
+'''
+
+CONFIG = {'file_transcription': {'language_id': 'en', 'mode': 'advanced'}}
+
+# 16 kHz, 16-bit mono
+PCM_16K_BYTES_PER_SEC = 32000
+
+MiB = 1024 * 1024
+
+
+def upload(vai, server, files: int = 200, file_size: int = 256 * 1024, concurrency: int = 16) -> Report:
+    '''
+    Throughput of `transcribe` uploads, `concurrency` at a time.\n
+    Latency is the time of each `transcribe` call, from the start of the
+    upload until the job id is returned.
+    '''
+    data = b'\0' * file_size
+
+    def one(_):
+        t = time.monotonic()
+        vai.transcribe(data, CONFIG)
+        return time.monotonic() - t
+
+    latencies, errors, seconds = _run_many(one, range(files), concurrency)
+    return _report(
+        'upload', server, dict(files=files, file_size=file_size, concurrency=concurrency),
+        files, errors, seconds, 'files', latencies,
+        mib_per_second=(files - errors) * file_size / MiB / seconds,
+    )
+
+
+def poll(vai, server, jobs: int = 50, job_duration: float = 1.0, interval: float = 0.1, concurrency: int = 16) -> Report:
+    '''
+    Overhead of polling jobs until they complete with `poll_until_complete`,
+    polling every `interval` seconds.\n
+    Latency is how long after completing on the server each job was seen as
+    completed, i.e. the overhead on top of `job_duration`.
+    '''
+    server.job_duration = job_duration
+    submitted = []
+    for _ in range(jobs):
+        job_id = vai.transcribe(b'\0' * 1024, CONFIG)
+        submitted.append((job_id, time.monotonic()))
+    server.reset()
+
+    def one(item):
+        job_id, t = item
+        vai.poll_until_complete(job_id, poll_schedule=[interval])
+        return time.monotonic() - t - job_duration
+
+    latencies, errors, seconds = _run_many(one, submitted, concurrency)
+    polls = server.counts['poll'] + server.counts['jobs_batch']
+    report = _report(
+        'poll', server, dict(jobs=jobs, job_duration=job_duration, interval=interval, concurrency=concurrency),
+        jobs, errors, seconds, 'polls', latencies, polls_per_job=polls / max(1, jobs),
+    )
+    # throughput in poll requests, not jobs, since jobs take as long as the server says
+    return report._replace(throughput=polls / seconds)
+
+
+def stream(
+    vai,
+    server,
+    sessions: int = 4,
+    audio_seconds: float = 10.0,
+    chunk_duration: float = 0.1,
+    realtime: bool = False,
+) -> Report:
+    '''
+    Round trip latency of streaming transcription over `sessions` concurrent
+    `StreamTranscriber` sessions, each sending `audio_seconds` of 16 kHz PCM
+    in `chunk_duration` chunks, in real time or as fast as possible.\n
+    Latency is the time from the most recent chunk sent to each result, and
+    throughput seconds of audio streamed per second.
+    '''
+    chunk = b'\0' * int(PCM_16K_BYTES_PER_SEC * chunk_duration)
+    chunks = int(audio_seconds / chunk_duration)
+    # only wait for the server's last results, not the default idle time
+    linger = 0.2 + 2 * (server.latency + server.jitter)
+
+    def audio():
+        start = time.monotonic()
+        for i in range(chunks):
+            if realtime:
+                time.sleep(max(0.0, start + i * chunk_duration - time.monotonic()))
+            yield chunk
+
+    def one(_):
+        latencies = []
+        with StreamTranscriber(vai, 'en', audio(), linger=linger) as st:
+            for res in st:
+                if res.latency is not None:
+                    latencies.append(res.latency)
+        return latencies
+
+    results, errors, seconds = _run_many(one, range(sessions), sessions)
+    latencies = [lat for res in results for lat in res]
+    audio_total = (sessions - errors) * chunks * chunk_duration
+    report = _report(
+        'stream', server, dict(sessions=sessions, audio_seconds=audio_seconds, chunk_duration=chunk_duration, realtime=realtime),
+        len(latencies), errors, seconds, 'audio seconds', latencies,
+        results_per_second=len(latencies) / seconds,
+    )
+    return report._replace(throughput=audio_total / seconds)
+
+
+def synthesize(vai, server, requests: int = 200, audio_bytes: int = 64 * 1024, concurrency: int = 16) -> Report:
+    '''
+    Throughput of streamed text to speech with `synthesize_stream`,
+    `concurrency` requests at a time, each for different text.\n
+    Latency is the time until the whole audio was read; the time to its
+    first byte is in `extra`.
+    '''
+    server.tts_bytes = audio_bytes
+    lock = threading.Lock()
+    ttfbs = []
+
+    def one(i):
+        t = time.monotonic()
+        data = {'text': f'benchmark sentence {i}', 'voice_id': 'en-female-1', 'stream': True}
+        with vai.synthesize_stream(data) as audio:
+            for _ in audio:
+                pass
+        with lock:
+            ttfbs.append(audio.ttfb)
+        return time.monotonic() - t
+
+    latencies, errors, seconds = _run_many(one, range(requests), concurrency)
+    return _report(
+        'synthesize', server, dict(requests=requests, audio_bytes=audio_bytes, concurrency=concurrency),
+        requests, errors, seconds, 'requests', latencies,
+        mib_per_second=(requests - errors) * audio_bytes / MiB / seconds,
+        ttfb=utils.percentiles(ttfbs),
+    )
+
+
+SCENARIOS = {
+    'upload': upload,
+    'poll': poll,
+    'stream': stream,
+    'synthesize': synthesize,
+}
+
+
+def run(
+    scenarios=None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+    concurrency: int = 16,
+    params=None,
+) -> dict:
+    '''
+    Run benchmark scenarios against a local `FakeServer`.\n
+    Returns a JSON serializable run: the server settings, the platform, and
+    one `Report` dict per scenario. Save it and pass it to `compare` later to
+    see how a change moved the numbers.
+
+    Parameters
+    ----------
+    scenarios: list of str, optional
+        Names of the scenarios to run, see `SCENARIOS`. Defaults to all.
+    latency, jitter, error_rate: float
+        Server latency and error injection, see `FakeServer`.
+    seed: int
+        Seed of the server's jitter and error injection.
+    concurrency: int
+        Threads used by the upload, poll and synthesize scenarios.
+    params: dict, optional
+        Extra keyword arguments of each scenario, by scenario name,
+        e.g. `{'upload': {'files': 1000}}`.
+    '''
+    names = list(scenarios) if scenarios else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f'Unknown scenarios {sorted(unknown)}, expected some of {list(SCENARIOS)}')
+    params = params or {}
+
+    base_url = K.BASE_URL
+    reports = []
+    with FakeServer(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed) as server:
+        K.set_base_url(server.url)
+        vai = VoiceAI(api_key='benchmark', transport=TransportConfig(pool_maxsize=concurrency))
+        try:
+            for name in names:
+                kwargs = dict(params.get(name, {}))
+                if name != 'stream':
+                    kwargs.setdefault('concurrency', concurrency)
+                server.reset()
+                reports.append(SCENARIOS[name](vai, server, **kwargs)._asdict())
+        finally:
+            vai.close()
+            K.set_base_url(base_url)
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'neuralspace': version,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'server': dict(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed),
+        'reports': reports,
+    }
+
+
+def compare(baseline: dict, current: dict) -> list:
+    '''
+    Relative change of each scenario in both runs, as dicts with the
+    baseline and current throughput and p50 and p99 latency, and their
+    change in percent. Positive throughput and negative latency changes
+    are improvements.
+    '''
+    base = {r['scenario']: r for r in baseline['reports']}
+    rows = []
+    for r in current['reports']:
+        b = base.get(r['scenario'])
+        if b is None:
+            continue
+        row = {'scenario': r['scenario'], 'unit': r['unit']}
+        for key, old, new in [
+            ('throughput', b['throughput'], r['throughput']),
+            ('p50', b['latency'].get('p50'), r['latency'].get('p50')),
+            ('p99', b['latency'].get('p99'), r['latency'].get('p99')),
+        ]:
+            row[key] = (old, new, _change(old, new))
+        if b['params'] != r['params']:
+            row['params_differ'] = True
+        rows.append(row)
+    return rows
+
+
+def format_run(run_result: dict, baseline: dict = None) -> str:
+    '''
+    Human readable table of a run, with the change from `baseline` if given.
+    '''
+    s = run_result['server']
+    lines = [
+        f"neuralspace {run_result['neuralspace']}, Python {run_result['python']}, "
+        f"server latency {s['latency'] * 1000:g}ms + {s['jitter'] * 1000:g}ms jitter, "
+        f"{s['error_rate']:.1%} errors",
+        '',
+        f"{'scenario':<12}{'ops':>8}{'errors':>8}{'seconds':>9}{'throughput':>22}{'p50 ms':>10}{'p99 ms':>10}",
+    ]
+    for r in run_result['reports']:
+        tput = f"{r['throughput']:.1f} {r['unit']}/s"
+        lines.append(
+            f"{r['scenario']:<12}{r['ops']:>8}{r['errors']:>8}{r['seconds']:>9.2f}{tput:>22}"
+            f"{_ms(r['latency'].get('p50')):>10}{_ms(r['latency'].get('p99')):>10}"
+        )
+    if baseline is not None:
+        lines += ['', f"change from baseline of {baseline['time']}:"]
+        for row in compare(baseline, run_result):
+            note = '  (different parameters)' if row.get('params_differ') else ''
+            lines.append(
+                f"{row['scenario']:<12}throughput {_pct(row['throughput'][2])}, "
+                f"p50 {_pct(row['p50'][2])}, p99 {_pct(row['p99'][2])}{note}"
+            )
+    return '\n'.join(lines)
+
+
+def _run_many(func, items, concurrency):
+    '''
+    Call `func` on each item on `concurrency` threads.\n
+    Returns the results of the calls that succeeded, the number of failures
+    and the wall clock time taken.
+    '''
+    results = []
+    errors = 0
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for fut in [ex.submit(func, item) for item in items]:
+            try:
+                results.append(fut.result())
+            except Exception:
+                errors += 1
+    return results, errors, time.monotonic() - start
+
+
+def _report(scenario, server, params, ops, errors, seconds, unit, latencies, **extra):
+    extra['server_requests'] = dict(server.counts)
+    return Report(
+        scenario=scenario,
+        params=params,
+        ops=ops,
+        errors=errors,
+        seconds=seconds,
+        throughput=(ops - errors) / seconds,
+        unit=unit,
+        latency=utils.percentiles(latencies),
+        extra=extra,
+    )
+
+
+def _change(old, new):
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.1f}'
+
+
+def _pct(change):
+    return '-' if change is None else f'{change:+.1f}%'
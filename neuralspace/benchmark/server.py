@@ -0,0 +1,365 @@
+import json
+import time
+import uuid
+import socket
+import random
+import asyncio
+import threading
+from collections import Counter
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+from neuralspace import constants as K
+
+
+class FakeServer:
+
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        job_duration: float = 1.0,
+        tts_bytes: int = 64 * 1024,
+        tts_chunk_size: int = 16 * 1024,
+        seed: int = None,
+    ):
+        '''
+        Local stand-in for the VoiceAI API, for benchmarks and offline tests.\n
+        Serves the jobs, token, languages, TTS, voices, dicts and prompts
+        endpoints and the streaming websocket at the paths in `constants`, on
+        a background thread. Point clients at it with `constants.set_base_url(server.url)`.
+        ```
+        with FakeServer(latency=0.02, error_rate=0.01) as server:
+            K.set_base_url(server.url)
+            vai = VoiceAI(api_key='bench')
+            ...
+        ```
+        Requires aiohttp (`pip install neuralspace[bench]`).
+
+        Parameters
+        ----------
+        host: str
+            Interface to listen on.
+        port: int
+            Port to listen on. 0 picks a free one, see `url`.
+        latency: float
+            Seconds added before every response and every streaming result.
+        jitter: float
+            Up to this many more seconds added at random to `latency`.
+        error_rate: float
+            Fraction of HTTP requests, websocket upgrades included, answered
+            with `error_status` instead.
+        error_status: int
+            Status of injected errors.
+        job_duration: float
+            Seconds from uploading a transcription job until it is completed.
+        tts_bytes: int
+            Size of the audio returned by streamed TTS requests.
+        tts_chunk_size: int
+            Size of the chunks the TTS audio is written in.
+        seed: int, optional
+            Seed of the latency jitter and error injection, for repeatable runs.
+        '''
+        if web is None:
+            raise ValueError('FakeServer needs aiohttp, install it with `pip install neuralspace[bench]`')
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f'error_rate must be between 0 and 1, got {error_rate}')
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.job_duration = job_duration
+        self.tts_bytes = tts_bytes
+        self.tts_chunk_size = tts_chunk_size
+        # requests served by route name, plus `errors` injected
+        self.counts = Counter()
+        self.bytes_received = 0
+        self._random = random.Random(seed)
+        self._jobs = {}
+        self._synthesis_jobs = {}
+        self._dicts = {}
+        self._loop = None
+        self._thread = None
+        self._runner = None
+
+
+    @property
+    def url(self) -> str:
+        '''
+        Base URL of the running server, e.g. `http://127.0.0.1:43521`.
+        '''
+        return f'http://{self.host}:{self.port}'
+
+
+    def start(self):
+        '''
+        Start serving on a background thread. Returns the server.
+        '''
+        if self._thread is not None:
+            return self
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='ns-fake-server', daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(sock), self._loop).result()
+        return self
+
+
+    def stop(self):
+        '''
+        Stop serving and wait for the background thread to exit.
+        '''
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        self._loop = None
+        self._runner = None
+
+
+    def reset(self):
+        '''
+        Zero the request counters, e.g. between benchmark scenarios.
+        '''
+        self.counts.clear()
+        self.bytes_received = 0
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+    async def _serve(self, sock):
+        @web.middleware
+        async def inject(request, handler):
+            return await self._inject(request, handler)
+
+        app = web.Application(middlewares=[inject], client_max_size=1 << 34)
+        r = app.router
+        jobs = _path(K.JOBS_URL)
+        if K.JOBS_BATCH_URL is not None:
+            r.add_post(_path(K.JOBS_BATCH_URL), self._jobs_batch, name='jobs_batch')
+        r.add_post(jobs, self._create_job, name='upload')
+        r.add_get(f'{jobs}/{{id}}', self._get_job, name='poll')
+        r.add_get(_path(K.TOKEN_URL), self._token, name='token')
+        r.add_get(_path(K.LANGS_URL), self._languages, name='languages')
+        r.add_get(_path(K.VOICES_URL), self._voices, name='voices')
+        tts = _path(K.TTS_URL)
+        r.add_post(tts, self._tts, name='tts')
+        r.add_get(tts, self._tts_jobs, name='tts_jobs')
+        r.add_get(f'{tts}/{{id}}', self._tts_job, name='tts_job')
+        r.add_delete(f'{tts}/{{id}}', self._delete_tts_job, name='tts_delete')
+        dicts = _path(K.VOCAB_ADAPT_URL)
+        r.add_post(dicts, self._create_dict, name='dict_create')
+        r.add_get(dicts, self._list_dicts, name='dicts')
+        r.add_get(f'{dicts}/{{id}}', self._get_dict, name='dict')
+        r.add_patch(f'{dicts}/{{id}}', self._update_dict, name='dict_update')
+        r.add_post(_path(K.AMA_URL), self._prompts, name='prompts')
+        r.add_get(f'{_path(K.STREAM_URL)}/{{lang}}/{{token}}/{{session}}', self._stream, name='stream')
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+
+
+    async def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+    async def _inject(self, request, handler):
+        route = request.match_info.route.name or 'unknown'
+        self.counts[route] += 1
+        await self._delay()
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.counts['errors'] += 1
+            return web.json_response(
+                {'success': False, 'message': 'injected error'}, status=self.error_status
+            )
+        return await handler(request)
+
+
+    async def _create_job(self, request):
+        size = 0
+        name = None
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == K.k_config:
+                await part.text()
+                continue
+            name = part.filename
+            while True:
+                chunk = await part.read_chunk()
+                if not chunk:
+                    break
+                size += len(chunk)
+        self.bytes_received += size
+        job_id = str(uuid.uuid4())
+        self._jobs[job_id] = (time.monotonic(), name, size)
+        return _ok({K.k_job_id: job_id})
+
+
+    async def _get_job(self, request):
+        job_id = request.match_info['id']
+        if job_id not in self._jobs:
+            return web.json_response({'success': False, 'message': 'Job not found'}, status=404)
+        return _ok(self._job_status(job_id))
+
+
+    async def _jobs_batch(self, request):
+        body = await request.json()
+        return _ok([self._job_status(j) for j in body[K.k_job_ids] if j in self._jobs])
+
+
+    def _job_status(self, job_id):
+        created, name, size = self._jobs[job_id]
+        data = {K.k_job_id: job_id, 'filename': name, 'fileSize': size}
+        if time.monotonic() - created < self.job_duration:
+            data[K.k_status] = 'Queued'
+            return data
+        data[K.k_status] = 'Completed'
+        data['result'] = {
+            'transcription': {
+                'transcript': 'hello world',
+                'timestamps': [
+                    {'word': 'hello', 'start': 0.0, 'end': 0.5, 'conf': 1.0},
+                    {'word': 'world', 'start': 0.5, 'end': 1.0, 'conf': 1.0},
+                ],
+                'segments': [{'startTime': 0.0, 'endTime': 1.0, 'text': 'hello world'}],
+            },
+        }
+        return data
+
+
+    async def _token(self, request):
+        return _ok({K.k_token: uuid.uuid4().hex})
+
+
+    async def _languages(self, request):
+        return _ok({K.k_langs: ['en', 'ar', 'hi']})
+
+
+    async def _voices(self, request):
+        return _ok([{'id': 'en-female-1', 'language': 'en'}])
+
+
+    async def _tts(self, request):
+        data = await request.json()
+        if not data.get('stream'):
+            job_id = str(uuid.uuid4())
+            self._synthesis_jobs[job_id] = data
+            return _ok({K.k_job_id: job_id})
+        resp = web.StreamResponse(headers={'Content-Type': 'audio/wav'})
+        resp.content_length = self.tts_bytes
+        await resp.prepare(request)
+        left = self.tts_bytes
+        while left > 0:
+            n = min(left, self.tts_chunk_size)
+            await resp.write(b'\0' * n)
+            left -= n
+        await resp.write_eof()
+        return resp
+
+
+    async def _tts_jobs(self, request):
+        page = int(request.query.get('pageNumber', 1))
+        size = int(request.query.get('pageSize', 10))
+        ids = list(self._synthesis_jobs)
+        jobs = [{K.k_job_id: j} for j in ids[(page - 1) * size:page * size]]
+        return _ok({'jobs': jobs, 'total': len(ids), 'pageSize': size, 'page': page})
+
+
+    async def _tts_job(self, request):
+        job_id = request.match_info['id']
+        return _ok({K.k_job_id: job_id, K.k_status: 'Completed'})
+
+
+    async def _delete_tts_job(self, request):
+        deleted = self._synthesis_jobs.pop(request.match_info['id'], None) is not None
+        return _ok({'deletedCount': int(deleted)})
+
+
+    async def _create_dict(self, request):
+        body = await request.json()
+        dict_id = uuid.uuid4().hex
+        self._dicts[dict_id] = {K.k_dict_id: dict_id, 'name': body['name'], K.k_words: list(body[K.k_words])}
+        return _ok({K.k_dict_id: dict_id})
+
+
+    async def _list_dicts(self, request):
+        return _ok([{K.k_dict_id: d[K.k_dict_id], 'name': d['name']} for d in self._dicts.values()])
+
+
+    async def _get_dict(self, request):
+        d = self._dicts.get(request.match_info['id'])
+        if d is None:
+            return web.json_response({'success': False, 'message': 'Dictionary not found'}, status=404)
+        return _ok(d)
+
+
+    async def _update_dict(self, request):
+        d = self._dicts.get(request.match_info['id'])
+        if d is None:
+            return web.json_response({'success': False, 'message': 'Dictionary not found'}, status=404)
+        body = await request.json()
+        words = body[K.k_words]
+        if body.get('op') == 'add':
+            known = set(d[K.k_words])
+            d[K.k_words] += [w for w in words if w not in known]
+        elif body.get('op') == 'remove':
+            drop = set(words)
+            d[K.k_words] = [w for w in d[K.k_words] if w not in drop]
+        return _ok({'message': 'Dictionary updated'})
+
+
+    async def _prompts(self, request):
+        body = await request.json()
+        answers = [f'answer to {p}' for p in body.get('prompts', [])]
+        return _ok({K.k_job_id: body.get(K.k_job_id), 'answers': answers})
+
+
+    async def _stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        received = 0
+        chunks = 0
+        async for msg in ws:
+            if msg.type != web.WSMsgType.BINARY:
+                continue
+            received += len(msg.data)
+            chunks += 1
+            await self._delay()
+            # every fifth result is final, like the end of an utterance
+            full = chunks % 5 == 0
+            await ws.send_str(json.dumps({'text': f'{received} bytes', 'full': full}))
+        return ws
+
+
+def _path(path):
+    return '/' + path.strip('/')
+
+
+def _ok(data):
+    return web.json_response({'success': True, 'message': 'Success', K.k_data: data})
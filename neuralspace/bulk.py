@@ -0,0 +1,400 @@
+import os
+import time
+import heapq
+import itertools
+import queue
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from neuralspace import utils
+
+
+TranscribeResult = namedtuple(
+    'TranscribeResult', ['index', 'file', 'job_id', 'result', 'error']
+)
+TranscribeResult.__doc__ = '''
+Outcome of one file submitted through `VoiceAI.transcribe_many`.\n
+`index` is the position of the file in the input, `result` is the completed
+job status (as returned by `get_job_status`) and `error` is the exception
+raised while uploading or polling, or a `ValueError` if the job failed.
+'''
+
+SynthesisResult = namedtuple(
+    'SynthesisResult', ['index', 'name', 'data', 'audio', 'path', 'error']
+)
+SynthesisResult.__doc__ = '''
+Outcome of one request submitted through `VoiceAI.synthesize_many`.\n
+`audio` holds the audio bytes, unless it was written to `path` in the
+output directory. `error` is the exception raised, if any.
+'''
+
+AMAResult = namedtuple(
+    'AMAResult', ['index', 'job_id', 'prompts', 'result', 'error']
+)
+AMAResult.__doc__ = '''
+Outcome of one transcript submitted through `VoiceAI.ama_many`.\n
+`result` is the server's response, as returned by `ama`, and `error` the
+exception raised, if any.
+'''
+
+SynthesisProgress = namedtuple(
+    'SynthesisProgress', ['completed', 'failed', 'elapsed', 'items_per_second']
+)
+SynthesisProgress.__doc__ = '''
+Progress of `VoiceAI.synthesize_many`, passed to `on_progress` after every item.\n
+`completed` counts finished items, including the `failed` ones.
+'''
+
+
+def transcribe_many(vai, files, config, max_workers=8, max_in_flight=64, poll_schedule=None, trim_silence=False):
+    '''
+    Generator behind `VoiceAI.transcribe_many`.\n
+    Uploads and status polls share one pool of `max_workers` threads, so the
+    number of threads and connections stays fixed no matter how many files
+    are given. At most `max_in_flight` files are uploading or waiting for
+    their job to complete at any time; the next file is only read from
+    `files` once a slot frees up.
+    '''
+    if max_workers < 1:
+        raise ValueError(f'max_workers must be at least 1, got {max_workers}')
+    if max_in_flight < 1:
+        raise ValueError(f'max_in_flight must be at least 1, got {max_in_flight}')
+
+    files = enumerate(files)
+    exhausted = False
+    # future -> (index, file, job_id, schedule)
+    uploads = {}
+    polls = {}
+    # (deadline, seq, index, file, job_id, schedule)
+    due = []
+    seq = itertools.count()
+    in_flight = 0
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            while not exhausted and in_flight < max_in_flight:
+                try:
+                    index, file = next(files)
+                except StopIteration:
+                    exhausted = True
+                    break
+                fut = executor.submit(vai._submit, file, config, trim_silence=trim_silence)
+                uploads[fut] = (index, file, None, None)
+                in_flight += 1
+
+            now = time.monotonic()
+            while due and due[0][0] <= now:
+                _, _, index, file, job_id, schedule = heapq.heappop(due)
+                fut = executor.submit(vai.get_job_status, job_id)
+                polls[fut] = (index, file, job_id, schedule)
+
+            if not uploads and not polls:
+                if not due:
+                    return
+                time.sleep(max(0, due[0][0] - time.monotonic()))
+                continue
+
+            timeout = None
+            if due:
+                timeout = max(0, due[0][0] - time.monotonic())
+            done, _ = wait(list(uploads) + list(polls), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                if fut in uploads:
+                    index, file, _, _ = uploads.pop(fut)
+                    try:
+                        job_id = fut.result()
+                    except Exception as e:
+                        in_flight -= 1
+                        yield TranscribeResult(index, file, None, None, e)
+                        continue
+                    schedule = utils.iter_poll_schedule(poll_schedule)
+                    deadline = time.monotonic() + next(schedule)
+                    heapq.heappush(due, (deadline, next(seq), index, file, job_id, schedule))
+                else:
+                    index, file, job_id, schedule = polls.pop(fut)
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        in_flight -= 1
+                        yield TranscribeResult(index, file, job_id, None, e)
+                        continue
+                    if utils.is_completed(result):
+                        in_flight -= 1
+                        yield TranscribeResult(index, file, job_id, result, None)
+                    elif utils.is_failed(result):
+                        in_flight -= 1
+                        yield TranscribeResult(index, file, job_id, result, ValueError(f'Job {job_id} failed'))
+                    else:
+                        deadline = time.monotonic() + next(schedule)
+                        heapq.heappush(due, (deadline, next(seq), index, file, job_id, schedule))
+    finally:
+        for fut in itertools.chain(uploads, polls):
+            fut.cancel()
+        executor.shutdown(wait=False)
+
+
+class SynthesisBatch:
+
+
+    def __init__(self, vai, items, out_dir=None, max_workers=8, ordered=True, on_progress=None):
+        '''
+        Iterator behind `VoiceAI.synthesize_many`.\n
+        At most `2 * max_workers` items are read from `items` ahead of the
+        results being consumed, so any number of items can be given.
+        '''
+        if max_workers < 1:
+            raise ValueError(f'max_workers must be at least 1, got {max_workers}')
+        self._vai = vai
+        self._items = items
+        self.out_dir = out_dir
+        self.max_workers = max_workers
+        self.ordered = ordered
+        self._on_progress = on_progress
+        self.completed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        # index -> (name, exception) of every failed item
+        self.errors = {}
+        self._started = False
+
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('SynthesisBatch can only be iterated once')
+        self._started = True
+        if self.out_dir is not None:
+            os.makedirs(self.out_dir, exist_ok=True)
+        items = enumerate(self._items)
+        max_in_flight = 2 * self.max_workers
+        pending = deque() if self.ordered else set()
+        exhausted = False
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ns-synthesize')
+        try:
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        index, item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    fut = executor.submit(self._run, index, item)
+                    if self.ordered:
+                        pending.append(fut)
+                    else:
+                        pending.add(fut)
+                if not pending:
+                    return
+                if self.ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    pending -= done
+                for fut in done:
+                    res = fut.result()
+                    self.completed += 1
+                    if res.error is not None:
+                        self.failed += 1
+                        self.errors[res.index] = (res.name, res.error)
+                    self.elapsed = time.monotonic() - started
+                    if self._on_progress is not None:
+                        rate = self.completed / self.elapsed if self.elapsed > 0 else 0.0
+                        self._on_progress(SynthesisProgress(self.completed, self.failed, self.elapsed, rate))
+                    yield res
+        finally:
+            for fut in pending:
+                fut.cancel()
+            executor.shutdown(wait=False)
+
+
+    def summary(self):
+        '''
+        Counts of the items processed so far, and the error of every failed one.
+        '''
+        return {
+            'completed': self.completed,
+            'succeeded': self.completed - self.failed,
+            'failed': self.failed,
+            'elapsed': self.elapsed,
+            'errors': {index: f'{name}: {e!r}' if name else repr(e) for index, (name, e) in self.errors.items()},
+        }
+
+
+    def _run(self, index, item):
+        name = None
+        data = item
+        if isinstance(item, tuple):
+            name, data = item
+        try:
+            data = dict(self._vai._resolve_config(data), stream=True)
+            if self.out_dir is None:
+                # unlike `synthesize`, raises on error responses instead of returning them as audio
+                if self._vai._tts_cache is not None:
+                    audio = self._vai._tts_cache.fetch(self._vai._tts_cache.key(data), self._vai._synthesize_audio, data)
+                else:
+                    audio = self._vai._synthesize_audio(data)
+                return SynthesisResult(index, name, data, audio, None, None)
+            if name is None:
+                name = f'{index:06d}.wav'
+            path = os.path.join(self.out_dir, name)
+            # only complete files ever appear under the final name
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                self._vai.synthesize_stream(data, sink=tmp)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            return SynthesisResult(index, name, data, None, path, None)
+        except Exception as e:
+            return SynthesisResult(index, name, data, None, None, e)
+
+
+def paginate(fetch_page, start_page=1, page_size=100, prefetch=True):
+    '''
+    Generator of the records of consecutive pages, `fetch_page(number)`
+    returning `(records, total)` with `total` possibly None.\n
+    With `prefetch`, the next page is requested in the background while the
+    records of the current one are consumed. Only one page is held at a time.
+    '''
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ns-paginate') if prefetch else None
+    number = start_page
+    seen = 0
+    nxt = None
+    try:
+        while True:
+            if nxt is not None:
+                records, total = nxt.result()
+            else:
+                records, total = fetch_page(number)
+            nxt = None
+            seen += len(records)
+            last = len(records) < page_size or (total is not None and seen >= total)
+            number += 1
+            if not last and executor is not None:
+                nxt = executor.submit(fetch_page, number)
+            yield from records
+            records = None
+            if last:
+                return
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def fan_out(func, keys, max_workers=8):
+    '''
+    Call `func(key)` for every key on a pool of `max_workers` threads.\n
+    Yields `(key, result, error)` as each call completes, with `error` set
+    instead of raising. At most `2 * max_workers` keys are read ahead.
+    '''
+    if max_workers < 1:
+        raise ValueError(f'max_workers must be at least 1, got {max_workers}')
+    keys = iter(keys)
+    pending = {}
+    exhausted = False
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ns-fan-out')
+    try:
+        while True:
+            while not exhausted and len(pending) < 2 * max_workers:
+                try:
+                    key = next(keys)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, key)] = key
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    yield key, None, e
+                else:
+                    yield key, result, None
+    finally:
+        for fut in pending:
+            fut.cancel()
+        executor.shutdown(wait=False)
+
+
+_DONE = object()
+
+
+def ama_many(vai, items, prompts=None, max_workers=8, limiter=None):
+    '''
+    Generator behind `VoiceAI.ama_many`.\n
+    `items` is read on a feeder thread, so that a slow source, such as
+    `transcribe_many` waiting for jobs to complete, never delays results
+    that are ready. At most `2 * max_workers` requests are queued at once.
+    '''
+    if max_workers < 1:
+        raise ValueError(f'max_workers must be at least 1, got {max_workers}')
+    results = queue.Queue()
+    slots = threading.Semaphore(2 * max_workers)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ns-ama')
+
+    def run(index, job_id, job_prompts):
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            result = vai.ama(job_id, job_prompts)
+            results.put(AMAResult(index, job_id, job_prompts, result, None))
+        except Exception as e:
+            results.put(AMAResult(index, job_id, job_prompts, None, e))
+        finally:
+            slots.release()
+
+    def feed():
+        try:
+            for index, item in enumerate(items):
+                job_id, job_prompts, error = _ama_item(item, prompts)
+                if error is not None:
+                    results.put(AMAResult(index, job_id, job_prompts, None, error))
+                    continue
+                slots.acquire()
+                if stop.is_set():
+                    return
+                executor.submit(run, index, job_id, job_prompts)
+        except Exception as e:
+            results.put(e)
+        finally:
+            if not stop.is_set():
+                # every slot is free again once all submitted requests have finished
+                for _ in range(2 * max_workers):
+                    slots.acquire()
+                results.put(_DONE)
+
+    feeder = threading.Thread(target=feed, name='ns-ama-feed', daemon=True)
+    feeder.start()
+    try:
+        while True:
+            res = results.get()
+            if res is _DONE:
+                return
+            if isinstance(res, Exception):
+                raise res
+            yield res
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+def _ama_item(item, prompts):
+    '''
+    `(job_id, prompts, error)` of an `ama_many` input item.
+    '''
+    if isinstance(item, TranscribeResult):
+        return item.job_id, prompts, item.error
+    if isinstance(item, tuple):
+        return item[0], item[1], None
+    return item, prompts, None
@@ -0,0 +1,172 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from neuralspace import constants as K
+
+
+# seconds each catalog endpoint stays cached, by endpoint name
+DEFAULT_TTLS = {
+    'languages': 3600,
+    'voices': 3600,
+    'custom_dicts': 60,
+    'custom_dict': 60,
+}
+
+MISSING = object()
+
+
+class CatalogCache:
+
+
+    def __init__(
+        self,
+        ttls=None,
+        default_ttl: float = 300,
+        maxsize: int = 256,
+        persist: bool = False,
+        path=None,
+    ):
+        '''
+        TTL + LRU cache for catalog endpoints of `VoiceAI`
+        (`languages`, `voices`, `get_custom_dicts`, `get_custom_dict`).\n
+        Entries are keyed by endpoint name plus arguments, e.g.
+        `('languages', 'file')` or `('custom_dict', dict_id)`.
+
+        Parameters
+        ----------
+        ttls: dict, optional
+            Seconds to keep each endpoint cached, overriding `DEFAULT_TTLS`.
+            A TTL of 0 disables caching for that endpoint.
+        default_ttl: float
+            TTL of endpoints missing from `ttls`.
+        maxsize: int
+            Maximum number of entries; least recently used ones are evicted first.
+        persist: bool
+            Also keep entries on disk under `NS_HOME`, so that new processes
+            start warm without any network round-trip.
+        path: str or Path, optional
+            Directory for the persisted entries. Defaults to `NS_HOME/cache`.
+        '''
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self.persist = persist
+        self.path = path if path is not None else K.NS_HOME / 'cache'
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), expires_at in wall-clock seconds so it survives restarts
+        self._data = OrderedDict()
+        self._file = None
+
+
+    def bind(self, namespace):
+        '''
+        Select the account the entries belong to, so that processes using
+        different API keys or base URLs never share persisted entries.
+        Loads the persisted entries of that namespace, if any.
+        '''
+        digest = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+        with self._lock:
+            self._data.clear()
+            self._file = None
+            if self.persist:
+                self._file = os.path.join(self.path, f'catalog-{digest}.json')
+                self._load()
+
+
+    def get(self, key):
+        '''
+        Cached value of `key`, or `MISSING`.\n
+        Returns a copy, so callers can modify it freely.
+        '''
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return copy.deepcopy(value)
+
+
+    def set(self, key, value):
+        ttl = self.ttls.get(key[0], self.default_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.time() + ttl, copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._save()
+
+
+    def invalidate(self, endpoint=None, *args):
+        '''
+        Drop cached entries.\n
+        With no arguments everything is dropped, with only `endpoint` all
+        entries of that endpoint, otherwise the single matching entry.
+        e.g. `cache.invalidate('custom_dict', dict_id)`
+        '''
+        with self._lock:
+            if endpoint is None:
+                self._data.clear()
+            elif args:
+                self._data.pop((endpoint,) + args, None)
+            else:
+                for key in [k for k in self._data if k[0] == endpoint]:
+                    del self._data[key]
+            self._save()
+
+
+    def fetch(self, key, func, *args, **kwargs):
+        '''
+        Cached value of `key`, calling `func(*args, **kwargs)` on a miss.
+        '''
+        value = self.get(key)
+        if value is MISSING:
+            value = func(*args, **kwargs)
+            self.set(key, value)
+        return value
+
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+    def _load(self):
+        try:
+            with open(self._file) as fp:
+                entries = json.load(fp)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in entries:
+            if expires_at > now:
+                self._data[tuple(key)] = (expires_at, value)
+
+
+    def _save(self):
+        if self._file is None:
+            return
+        now = time.time()
+        entries = [
+            [list(key), expires_at, value]
+            for key, (expires_at, value) in self._data.items()
+            if expires_at > now
+        ]
+        os.makedirs(self.path, exist_ok=True)
+        # write to a temporary file first, so concurrent readers never see a partial file
+        tmp = f'{self._file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as fp:
+            json.dump(entries, fp)
+        os.replace(tmp, self._file)
@@ -1,6 +1,20 @@
+import os
+import sys
+import glob
+import json
+import time
+import threading
+from typing import List, Optional
+
 import typer
 
+from neuralspace import audio
+from neuralspace import utils
 from neuralspace import constants as K
+from neuralspace.audio import AUDIO_FORMATS
+from neuralspace.voice_ai import VoiceAI
+from neuralspace.dedup import Deduplicator
+from neuralspace.streaming import StreamTranscriber
 
 
 app = typer.Typer(no_args_is_help=True)
@@ -36,19 +50,436 @@ def login(api_key: str = typer.Option('', help='Your API key')):
 
 
 @app.command()
-def stream(lang: str = typer.Option(..., '-l', '--lang', '--language', '--language-id', help='Language code')):
+def stream(
+    source: str = typer.Argument('-', help='WAV or raw PCM file, `-` for stdin'),
+    lang: str = typer.Option(..., '-l', '--lang', '--language', '--language-id', help='Language code'),
+    audio_format: str = typer.Option('pcm_16k', '-f', '--format', help='Stream format: pcm_16k or pcm_8k'),
+    raw_rate: Optional[int] = typer.Option(None, help='Sample rate of raw PCM input, if not that of --format'),
+    raw_channels: int = typer.Option(1, help='Channels of raw PCM input'),
+    frame_duration: float = typer.Option(0.1, help='Seconds of audio per message sent'),
+    realtime: bool = typer.Option(True, '--realtime/--fast', help='Send at real-time pace, or as fast as possible'),
+    sessions: int = typer.Option(1, '-n', '--sessions', help='Concurrent streams, each sending the whole audio'),
+    ramp: float = typer.Option(0.0, help='Seconds over which to spread the starts of the sessions'),
+    min_chunk_size: int = typer.Option(1, help='Seconds of audio processed for partial results'),
+    max_chunk_size: int = typer.Option(5, help='Seconds of audio processed for full results'),
+    partials: bool = typer.Option(True, '--partials/--no-partials', help='Print partial transcripts'),
+    quiet: bool = typer.Option(False, '-q', '--quiet', help='Print only the latency summary'),
+):
+    '''
+    Real-time streaming transcription of a file or stdin\n
+    Prints partial and final transcripts, then latency percentiles on
+    stderr. Raw PCM is 16-bit little-endian, and is streamed as it arrives
+    when read from stdin, e.g. `arecord -f S16_LE -r 16000 | ns stream -l en`.
+    With --sessions, that many streams send the same audio at once, e.g.
+    for load tests.
+    '''
+    if audio_format not in AUDIO_FORMATS:
+        raise typer.BadParameter(f'expected one of {list(AUDIO_FORMATS)}', param_hint='--format')
+    if sessions < 1:
+        raise typer.BadParameter('must be at least 1', param_hint='--sessions')
+    try:
+        chunks = _stream_audio(source, audio_format, frame_duration, raw_rate, raw_channels, live=sessions == 1)
+    except (ValueError, ImportError, OSError) as e:
+        raise typer.BadParameter(str(e), param_hint='SOURCE')
+    try:
+        vai = VoiceAI()
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(2)
+
+    rate = AUDIO_FORMATS[audio_format]
+    printer = _TranscriptPrinter(sessions, partials, quiet)
+    lock = threading.Lock()
+    latencies = []
+    first_results = []
+    failed = []
+
+    def run(i):
+        time.sleep(ramp * i / sessions)
+        frames = _paced(chunks, rate) if realtime else iter(chunks)
+        started = time.monotonic()
+        first = None
+        try:
+            with StreamTranscriber(
+                vai, lang, frames, audio_format=audio_format,
+                min_chunk_size=min_chunk_size, max_chunk_size=max_chunk_size,
+            ) as st:
+                for res in st:
+                    if first is None:
+                        first = time.monotonic() - started
+                    with lock:
+                        if res.latency is not None:
+                            latencies.append(res.latency)
+                    printer.show(i, res)
+        except Exception as e:
+            with lock:
+                failed.append(i)
+            printer.error(i, e)
+        with lock:
+            if first is not None:
+                first_results.append(first)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    finally:
+        printer.close()
+        vai.close()
+    elapsed = time.monotonic() - started
+
+    typer.echo(
+        f'{sessions - len(failed)}/{sessions} sessions ok, {len(latencies)} results in {elapsed:.2f}s', err=True
+    )
+    for name, values in [('result latency', latencies), ('first result', first_results)]:
+        pcts = utils.percentiles(values)
+        if pcts:
+            typer.echo(f'{name}: ' + ', '.join(f'{p} {v * 1000:.1f}ms' for p, v in pcts.items()), err=True)
+    if failed:
+        raise typer.Exit(1)
+
+
+class _TranscriptPrinter:
+
+
+    def __init__(self, sessions, partials=True, quiet=False):
+        '''
+        Prints stream results. With one session on a terminal, partial
+        results are updated in place; otherwise each result is a line,
+        prefixed with its session number when there are many.
+        '''
+        self.sessions = sessions
+        self.partials = partials
+        self.quiet = quiet
+        self._inline = sessions == 1 and sys.stdout.isatty()
+        self._pending = False
+        self._lock = threading.Lock()
+
+
+    def show(self, session, res):
+        if self.quiet or (not res.full and not self.partials):
+            return
+        with self._lock:
+            if self._inline:
+                typer.echo(f'\r{res.text}\033[K', nl=res.full)
+                self._pending = not res.full
+                return
+            prefix = f'[{session}] ' if self.sessions > 1 else ''
+            kind = 'final' if res.full else 'partial'
+            typer.echo(f'{prefix}{kind}: {res.text}')
+
+
+    def error(self, session, e):
+        with self._lock:
+            self._end_line()
+            typer.echo(f'session {session} failed: {e}', err=True)
+
+
+    def close(self):
+        with self._lock:
+            self._end_line()
+
+
+    def _end_line(self):
+        if self._pending:
+            typer.echo()
+            self._pending = False
+
+
+def _stream_audio(source, audio_format, frame_duration, raw_rate=None, raw_channels=1, live=True):
+    '''
+    Frames of int16 mono PCM in `audio_format` from a WAV or raw PCM file, or
+    stdin for `-`. With `live`, raw PCM on stdin that needs no conversion is
+    framed as it is read instead of after reading all of it, and the result
+    can be iterated only once; otherwise it is a list.
+    '''
+    rate = AUDIO_FORMATS[audio_format]
+    fp = sys.stdin.buffer if source == '-' else open(source, 'rb')
+    try:
+        head = fp.read(4)
+        is_raw = head != b'RIFF'
+        passthrough = is_raw and raw_channels == 1 and raw_rate in (None, rate)
+        if passthrough and live and source == '-':
+            return _read_frames(fp, head, max(1, int(round(rate * frame_duration))) * 2)
+        data = head + fp.read()
+    finally:
+        if fp is not sys.stdin.buffer:
+            fp.close()
+    if passthrough:
+        data = data[:len(data) - len(data) % 2]
+        return list(audio.frames(data, audio_format, frame_duration))
+    frames = audio.stream_frames(
+        data, audio_format=audio_format, frame_duration=frame_duration,
+        raw_rate=(raw_rate or rate) if is_raw else None, raw_channels=raw_channels,
+    )
+    return list(frames)
+
+
+def _read_frames(fp, head, size):
+    buf = head
+    while True:
+        chunk = fp.read(size - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) == size:
+            yield buf
+            buf = b''
+    buf = buf[:len(buf) - len(buf) % 2]
+    if buf:
+        yield buf
+
+
+def _paced(frames, rate):
     '''
-    Real-time streaming transcription from your microphone
+    `frames` of int16 PCM at `rate`, each yielded no sooner than real time allows.
     '''
-    typer.echo(f'Streaming with language: {lang}')
+    start = time.monotonic()
+    sent = 0.0
+    for frame in frames:
+        delay = start + sent - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        yield frame
+        sent += len(frame) / (2 * rate)
 
 
 @app.command()
-def transcribe(file: str = typer.Option(..., '-f', '--file', help='File to transcribe')):
+def transcribe(
+    paths: List[str] = typer.Argument(..., help='Audio files, globs or directories'),
+    config: Optional[str] = typer.Option(None, '-c', '--config', help='Job config, as a JSON file or string'),
+    lang: Optional[str] = typer.Option(None, '-l', '--lang', '--language', '--language-id', help='Language code, overrides the one in the config'),
+    concurrency: int = typer.Option(8, '-j', '--concurrency', help='Threads uploading and polling'),
+    max_in_flight: int = typer.Option(64, help='Most files uploading or waiting for their job at once'),
+    output: Optional[str] = typer.Option(None, '-o', '--output', help='JSONL file of results, `-` for stdout (the default without --out-dir)'),
+    out_dir: Optional[str] = typer.Option(None, '--out-dir', help='Write each result to <out-dir>/<file>.json, e.g. call.wav.json'),
+    resume: bool = typer.Option(False, '--resume', help='Skip files already completed in the outputs, and append to the JSONL file. Needs -o FILE or --out-dir'),
+    recursive: bool = typer.Option(True, '--recursive/--no-recursive', help='Search directories recursively'),
+    trim_silence: bool = typer.Option(False, '--trim-silence', help='Cut long silences out of WAV files before uploading'),
+    quiet: bool = typer.Option(False, '-q', '--quiet', help='Do not print progress'),
+):
     '''
-    File transcription
+    Bulk file transcription\n
+    Transcribes every audio file in PATHS, writing results as jobs finish.
+    Files already uploaded with the same config, e.g. by a run that was
+    interrupted, reuse their earlier job instead of being uploaded again.
+    Exits with status 1 if any file failed.
     '''
-    typer.echo(f'Transcribing file: {file}')
+    if config is None and lang is None:
+        raise typer.BadParameter('Provide a job config with --config, or at least a --lang')
+    try:
+        job_config = utils.resolve_config(config) if config is not None else {}
+    except (ValueError, OSError) as e:
+        raise typer.BadParameter(str(e), param_hint='--config')
+    if lang is not None:
+        job_config.setdefault('file_transcription', {'mode': 'advanced'})
+        job_config['file_transcription']['language_id'] = lang
+
+    if output is None and out_dir is None:
+        output = '-'
+    to_stdout = output == '-'
+    if resume and to_stdout and out_dir is None:
+        # nothing on stdout can be read back to tell which files are done
+        raise typer.BadParameter('needs -o FILE or --out-dir to resume from', param_hint='--resume')
+    files = _find_audio(paths, recursive)
+    done = set()
+    if resume:
+        done = _completed(output if not to_stdout else None, out_dir, files)
+    todo = [f for f in files if os.path.abspath(f) not in done]
+    if not quiet:
+        typer.echo(f'{len(files)} files, {len(files) - len(todo)} already done, {len(todo)} to transcribe', err=True)
+    if not todo:
+        return
+
+    try:
+        vai = VoiceAI(dedup=Deduplicator())
+    except ValueError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(2)
+    if to_stdout:
+        sink = sys.stdout
+    else:
+        sink = open(output, 'a' if resume else 'w') if output is not None else None
+    progress = _Progress(len(todo), quiet)
+    failed = 0
+    try:
+        results = vai.transcribe_many(
+            todo, job_config, max_workers=concurrency, max_in_flight=max_in_flight, trim_silence=trim_silence,
+        )
+        for res in results:
+            record = {
+                'file': res.file,
+                'job_id': res.job_id,
+                'status': 'failed' if res.error is not None else 'completed',
+                'result': res.result,
+                'error': None if res.error is None else str(res.error),
+            }
+            if res.error is not None:
+                failed += 1
+            elif out_dir is not None:
+                _write_json(_out_file(out_dir, files[res.file]), record)
+            if sink is not None:
+                sink.write(json.dumps(record) + '\n')
+                sink.flush()
+            progress.update(_size(res.file), res.error is not None)
+    finally:
+        progress.close()
+        if sink is not None and not to_stdout:
+            sink.close()
+        vai.close()
+    if failed:
+        raise typer.Exit(1)
+
+
+class _Progress:
+
+
+    def __init__(self, total, quiet=False, interval=10.0):
+        '''
+        Throughput and ETA on stderr: one line updated in place on a
+        terminal, or a new line every `interval` seconds otherwise.
+        '''
+        self.total = total
+        self.quiet = quiet
+        self.interval = interval
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        self._started = time.monotonic()
+        self._printed = 0.0
+        self._tty = sys.stderr.isatty()
+
+
+    def update(self, nbytes, failed=False):
+        self.completed += 1
+        self.failed += failed
+        self.bytes += nbytes
+        if self.quiet:
+            return
+        now = time.monotonic()
+        if self._tty:
+            typer.echo(f'\r{self._line(now)}\033[K', nl=False, err=True)
+        elif now - self._printed >= self.interval or self.completed == self.total:
+            typer.echo(self._line(now), err=True)
+            self._printed = now
+
+
+    def close(self):
+        if not self.quiet and self._tty and self.completed:
+            typer.echo(err=True)
+
+
+    def _line(self, now):
+        elapsed = max(now - self._started, 1e-9)
+        rate = self.completed / elapsed
+        eta = (self.total - self.completed) / rate if rate > 0 else 0
+        return (
+            f'{self.completed}/{self.total} done, {self.failed} failed, '
+            f'{rate:.2f} files/s, {self.bytes / elapsed / 1e6:.2f} MB/s, '
+            f'elapsed {_hms(elapsed)}, ETA {_hms(eta)}'
+        )
+
+
+def _find_audio(paths, recursive=True):
+    '''
+    Audio files in `paths`, mapped to their names relative to the directory
+    they were found in. Directories and globs are filtered by `FILE_EXTS`,
+    files named explicitly are taken as they are.
+    '''
+    found = {}
+    seen = set()
+
+    def add(path, name):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            found[path] = name
+
+    for p in paths:
+        if os.path.isdir(p):
+            for path in _audio_in_dir(p, recursive):
+                add(path, os.path.relpath(path, p))
+        elif glob.has_magic(p):
+            for m in sorted(glob.glob(p, recursive=True)):
+                if os.path.isdir(m):
+                    for path in _audio_in_dir(m, recursive):
+                        add(path, os.path.relpath(path, m))
+                elif _is_audio(m):
+                    add(m, os.path.basename(m))
+        elif os.path.isfile(p):
+            add(p, os.path.basename(p))
+        else:
+            raise typer.BadParameter(f'No such file or directory: {p}', param_hint='PATHS')
+    return found
+
+
+def _audio_in_dir(directory, recursive):
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        if not recursive:
+            dirs[:] = []
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if _is_audio(path):
+                yield path
+
+
+def _is_audio(path):
+    return os.path.splitext(path)[1][1:].lower() in K.FILE_EXTS
+
+
+def _completed(output, out_dir, files):
+    '''
+    Absolute paths of the `files` completed in every output given.
+    '''
+    done = None
+    if output is not None:
+        done = set()
+        try:
+            with open(output) as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted run may be cut short
+                        continue
+                    if record.get('status') == 'completed':
+                        done.add(os.path.abspath(record['file']))
+        except FileNotFoundError:
+            pass
+    if out_dir is not None:
+        written = {os.path.abspath(f) for f, name in files.items() if os.path.exists(_out_file(out_dir, name))}
+        done = written if done is None else done & written
+    return done or set()
+
+
+def _out_file(out_dir, name):
+    # keep the extension, so that call.wav and call.mp3 do not share call.json
+    return os.path.join(out_dir, name + '.json')
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # write to a temporary file first, so an interrupted run never leaves a partial result
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as fp:
+        json.dump(data, fp)
+    os.replace(tmp, path)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _hms(seconds):
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
 
 
 if __name__ == '__main__':
@@ -18,6 +18,11 @@ TTS_URL = 'api/v2/tts'
 if env.TTS_URL is not None:
     TTS_URL = env.TTS_URL
 
+# batch job status endpoint, used by `get_job_statuses` when available
+JOBS_BATCH_URL = None
+if env.JOBS_BATCH_URL is not None:
+    JOBS_BATCH_URL = env.JOBS_BATCH_URL
+
 STREAM_URL = 'voice/stream/live/transcribe'
 if env.STREAM_URL is not None:
     STREAM_URL = env.STREAM_URL
@@ -44,14 +49,31 @@ if env.AMA_URL is not None:
 
 # full url formation
 
-FULL_JOBS_URL = f'{BASE_URL.rstrip("/")}/{JOBS_URL.strip("/")}'
-FULL_STREAM_URL = f'{BASE_URL.replace("https://", "wss://").rstrip("/")}/{STREAM_URL.strip("/")}'
-FULL_LANGS_URL = f'{BASE_URL.rstrip("/")}/{LANGS_URL.strip("/")}'
-FULL_VOICES_URL = f'{BASE_URL.rstrip("/")}/{VOICES_URL.strip("/")}'
-FULL_TOKEN_URL = f'{BASE_URL.rstrip("/")}/{TOKEN_URL.strip("/")}'
-FULL_AMA_URL = f'{BASE_URL.rstrip("/")}/{AMA_URL.strip("/")}'
-FULL_TTS_URL = f'{BASE_URL.rstrip("/")}/{TTS_URL.strip("/")}'
-FULL_VOCAB_ADAPT_URL = f'{BASE_URL.rstrip("/")}/{VOCAB_ADAPT_URL.strip("/")}'
+def set_base_url(base_url):
+    '''
+    Point every endpoint at `base_url`, like setting `NS_BASE_URL` before
+    import, e.g. to use a local server. `http://` base URLs stream over
+    `ws://` and `https://` ones over `wss://`.
+    '''
+    global BASE_URL, FULL_JOBS_URL, FULL_JOBS_BATCH_URL, FULL_STREAM_URL, FULL_LANGS_URL
+    global FULL_VOICES_URL, FULL_TOKEN_URL, FULL_AMA_URL, FULL_TTS_URL, FULL_VOCAB_ADAPT_URL
+    BASE_URL = base_url
+    base = BASE_URL.rstrip('/')
+    ws_base = base.replace('https://', 'wss://', 1) if base.startswith('https://') else base.replace('http://', 'ws://', 1)
+    FULL_JOBS_URL = f'{base}/{JOBS_URL.strip("/")}'
+    FULL_JOBS_BATCH_URL = None
+    if JOBS_BATCH_URL is not None:
+        FULL_JOBS_BATCH_URL = f'{base}/{JOBS_BATCH_URL.strip("/")}'
+    FULL_STREAM_URL = f'{ws_base}/{STREAM_URL.strip("/")}'
+    FULL_LANGS_URL = f'{base}/{LANGS_URL.strip("/")}'
+    FULL_VOICES_URL = f'{base}/{VOICES_URL.strip("/")}'
+    FULL_TOKEN_URL = f'{base}/{TOKEN_URL.strip("/")}'
+    FULL_AMA_URL = f'{base}/{AMA_URL.strip("/")}'
+    FULL_TTS_URL = f'{base}/{TTS_URL.strip("/")}'
+    FULL_VOCAB_ADAPT_URL = f'{base}/{VOCAB_ADAPT_URL.strip("/")}'
+
+
+set_base_url(BASE_URL)
 
 
 # literals
@@ -65,6 +87,12 @@ k_job_id = 'jobId'
 k_status = 'status'
 k_langs = 'languages'
 k_completed = 'completed'
+k_job_ids = 'jobIds'
+k_dict_id = 'id'
+k_words = 'words'
+
+# most job ids sent in one batch status request
+JOBS_BATCH_SIZE = 100
 
 APP_NAME = f'NeuralSpace VoiceAI v{version}'
 
@@ -0,0 +1,196 @@
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+
+from neuralspace import constants as K
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(file):
+    '''
+    sha256 of a file's contents, read in chunks so memory use stays flat.\n
+    Returns None for streams that cannot be rewound after hashing.
+    '''
+    h = hashlib.sha256()
+    if isinstance(file, (str, Path)):
+        with open(file, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b''):
+                h.update(chunk)
+    elif isinstance(file, io.IOBase):
+        if not file.seekable():
+            return None
+        pos = file.tell()
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+        file.seek(pos)
+    else:
+        h.update(memoryview(file).cast('B'))
+    return h.hexdigest()
+
+
+def canonical_config(config):
+    return json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+class Deduplicator:
+
+
+    def __init__(self, path=None, verify: bool = True):
+        '''
+        Skips uploads of audio that was already submitted with the same config.\n
+        Submissions are keyed by a hash of the file contents plus the
+        canonicalized job config, and the job id of every submission is kept
+        in a local SQLite index. A repeated submission returns the existing
+        job id without uploading, and identical submissions running at the
+        same time share a single upload.
+
+        Parameters
+        ----------
+        path: str or Path, optional
+            SQLite index file. Defaults to `NS_HOME/dedup.sqlite3`.
+            Use `':memory:'` to deduplicate within the process only.
+        verify: bool
+            Check the status of a known job before reusing it, and submit
+            again if it failed or no longer exists.
+        '''
+        self.path = str(path) if path is not None else str(K.NS_HOME / 'dedup.sqlite3')
+        self.verify = verify
+        self._namespace = ''
+        self._lock = threading.Lock()
+        # key -> Future of the job id, for submissions still uploading
+        self._in_flight = {}
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS submissions ('
+            'key TEXT PRIMARY KEY, job_id TEXT NOT NULL, offsets TEXT, created REAL NOT NULL)'
+        )
+
+
+    def bind(self, namespace):
+        '''
+        Select the account submissions belong to, so that different API keys
+        or base URLs never share job ids.
+        '''
+        self._namespace = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+
+
+    def key(self, file, config, trim_silence=False):
+        '''
+        Dedup key of a submission, or None if the file cannot be hashed.
+        '''
+        digest = content_hash(file)
+        if digest is None:
+            return None
+        h = hashlib.sha256()
+        h.update(self._namespace.encode())
+        h.update(digest.encode())
+        h.update(canonical_config(config).encode())
+        h.update(repr(_trim_params(trim_silence)).encode())
+        return h.hexdigest()
+
+
+    def lookup(self, key):
+        '''
+        `(job_id, offsets)` of an earlier submission, or None.
+        '''
+        with self._lock:
+            row = self._db.execute(
+                'SELECT job_id, offsets FROM submissions WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, offsets = row
+        return job_id, json.loads(offsets) if offsets else None
+
+
+    def record(self, key, job_id, offsets=None):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO submissions (key, job_id, offsets, created) VALUES (?, ?, ?, ?)',
+                (key, job_id, json.dumps(offsets) if offsets is not None else None, time.time()),
+            )
+
+
+    def forget(self, key):
+        with self._lock:
+            self._db.execute('DELETE FROM submissions WHERE key = ?', (key,))
+
+
+    def submit(self, key, submit, check=None):
+        '''
+        Job id for `key`: an earlier one, one being submitted by another
+        thread right now, or a new one from calling `submit()`.
+
+        Parameters
+        ----------
+        key: str
+            From `key()`.
+        submit: callable
+            Uploads the file, returns `(job_id, offsets)`.
+        check: callable, optional
+            `check(job_id) -> bool`, whether an earlier job can be reused.
+            Only called when `verify` is set.
+
+        Returns
+        -------
+        job_id: str
+        offsets: list or None
+            Offset map segments stored with the job.
+        reused: bool
+            Whether no upload was made.
+        '''
+        with self._lock:
+            fut = self._in_flight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._in_flight[key] = fut
+        if not owner:
+            job_id, offsets = fut.result()
+            return job_id, offsets, True
+
+        try:
+            known = self.lookup(key)
+            if known is not None and self.verify and check is not None and not check(known[0]):
+                self.forget(key)
+                known = None
+            if known is not None:
+                job_id, offsets = known
+                reused = True
+            else:
+                job_id, offsets = submit()
+                self.record(key, job_id, offsets)
+                reused = False
+            fut.set_result((job_id, offsets))
+            return job_id, offsets, reused
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _trim_params(trim_silence):
+    if not trim_silence:
+        return None
+    if trim_silence is True:
+        return True
+    return sorted(vars(trim_silence).items())
+
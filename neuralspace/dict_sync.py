@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import threading
+
+from neuralspace import constants as K
+
+
+# most words sent in one create or PATCH request
+BATCH_SIZE = 1000
+
+_lock = threading.Lock()
+
+
+def unique(words):
+    '''
+    `words` without duplicates, in their original order.
+    '''
+    return list(dict.fromkeys(words))
+
+
+def fingerprint(words) -> str:
+    '''
+    Order-independent hash of a set of words.
+    '''
+    h = hashlib.sha256()
+    for w in sorted(set(words)):
+        h.update(w.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def batches(words, size=BATCH_SIZE):
+    for i in range(0, len(words), size):
+        yield words[i:i + size]
+
+
+class SyncState:
+
+
+    def __init__(self, namespace, path=None):
+        '''
+        Last synced id and fingerprint of each custom dictionary, kept in
+        `NS_HOME/dicts-<namespace hash>.json` so that `VoiceAI.sync_custom_dict`
+        can skip syncs with no changes without asking the server.
+        '''
+        digest = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+        directory = path if path is not None else K.NS_HOME
+        self.file = os.path.join(directory, f'dicts-{digest}.json')
+
+
+    def get(self, name):
+        '''
+        `{'id': ..., 'fingerprint': ...}` of the last sync of `name`, or None.
+        '''
+        return self._load().get(name)
+
+
+    def set(self, name, dict_id, fp):
+        with _lock:
+            state = self._load()
+            state[name] = {'id': dict_id, 'fingerprint': fp}
+            self._save(state)
+
+
+    def forget(self, name):
+        with _lock:
+            state = self._load()
+            if state.pop(name, None) is not None:
+                self._save(state)
+
+
+    def _load(self):
+        try:
+            with open(self.file) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+
+    def _save(self, state):
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        # write to a temporary file first, so concurrent readers never see a partial file
+        tmp = f'{self.file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as fp:
+            json.dump(state, fp)
+        os.replace(tmp, self.file)
@@ -7,6 +7,7 @@ NS_HOME = get('NS_HOME')
 API_KEY = get('NS_API_KEY')
 BASE_URL = get('NS_BASE_URL')
 JOBS_URL = get('NS_JOBS_URL')
+JOBS_BATCH_URL = get('NS_JOBS_BATCH_URL')
 STREAM_URL = get('NS_STREAM_URL')
 LANGS_URL = get('NS_LANGS_URL')
 TOKEN_URL = get('NS_TOKEN_URL')
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+
+from neuralspace import constants as K
+
+
+PENDING = 'pending'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+JobRecord = namedtuple(
+    'JobRecord', ['job_id', 'file', 'config', 'state', 'result', 'offsets', 'created', 'updated']
+)
+JobRecord.__doc__ = '''
+One transcription job in a `JobStore`.\n
+`file` is the path or name of the uploaded file, `state` is `pending`,
+`completed` or `failed`, and `result` is the last job status fetched once
+the job finished.
+'''
+
+_COLUMNS = ', '.join(JobRecord._fields)
+
+
+class JobStore:
+
+
+    def __init__(self, path=None, flush_interval: float = 0.2, batch_size: int = 1000):
+        '''
+        Durable record of transcription jobs, so that pending jobs survive
+        a restart of the process.\n
+        Every submission is written to a SQLite database along with its
+        state and, once finished, its result. Writes from all threads are
+        collected by one writer thread and committed together, so thousands
+        of submissions per minute cost a handful of transactions.
+
+        Parameters
+        ----------
+        path: str or Path, optional
+            SQLite database file. Defaults to `NS_HOME/jobs.sqlite3`.
+        flush_interval: float
+            Longest time in seconds a status update waits before being committed.
+        batch_size: int
+            Maximum number of writes committed in one transaction.
+        '''
+        self.path = str(path) if path is not None else str(K.NS_HOME / 'jobs.sqlite3')
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._namespace = ''
+        self._cond = threading.Condition()
+        # (sql, params, done event or None), in order
+        self._pending = []
+        self._thread = None
+        self._closed = False
+        self._db_lock = threading.Lock()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db_lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'job_id TEXT PRIMARY KEY, namespace TEXT NOT NULL, file TEXT, config TEXT, '
+                'state TEXT NOT NULL, result TEXT, offsets TEXT, created REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (namespace, state)')
+            self._db.commit()
+
+
+    def bind(self, namespace):
+        '''
+        Select the account jobs belong to, so that jobs of different API keys
+        are never polled with the wrong one.
+        '''
+        self._namespace = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+
+
+    def add(self, job_id, file=None, config=None, offsets=None):
+        '''
+        Record a new pending job. Blocks until the record is committed, so a
+        job id returned to the caller is never lost by a crash.
+        '''
+        now = time.time()
+        self._write(
+            'INSERT OR IGNORE INTO jobs (job_id, namespace, file, config, state, result, offsets, created, updated) '
+            'VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?)',
+            (
+                job_id,
+                self._namespace,
+                None if file is None else str(file),
+                None if config is None else json.dumps(config),
+                PENDING,
+                None if offsets is None else json.dumps(offsets),
+                now,
+                now,
+            ),
+            wait=True,
+        )
+
+
+    def finish(self, job_id, result, failed=False):
+        '''
+        Record the final status of a job. Committed with the next batch,
+        without waiting; a lost update only means the job is polled again.
+        '''
+        self._write(
+            'UPDATE jobs SET state = ?, result = ?, updated = ? WHERE job_id = ? AND namespace = ?',
+            (FAILED if failed else COMPLETED, json.dumps(result), time.time(), job_id, self._namespace),
+        )
+
+
+    def get(self, job_id):
+        '''
+        `JobRecord` of a job, or None if it is not in the store.
+        '''
+        rows = self._query('WHERE job_id = ? AND namespace = ?', (job_id, self._namespace))
+        return rows[0] if rows else None
+
+
+    def jobs(self, state=None):
+        '''
+        `JobRecord`s of all jobs, or only those in `state`, oldest first.
+        '''
+        if state is None:
+            return self._query('WHERE namespace = ? ORDER BY created', (self._namespace,))
+        return self._query('WHERE namespace = ? AND state = ? ORDER BY created', (self._namespace, state))
+
+
+    def unfinished(self):
+        '''
+        `JobRecord`s of jobs still pending, oldest first. See `VoiceAI.resume_jobs`.
+        '''
+        return self.jobs(PENDING)
+
+
+    def flush(self):
+        '''
+        Block until every write made so far is committed.
+        '''
+        self._write(None, None, wait=True)
+
+
+    def close(self):
+        '''
+        Commit outstanding writes and close the database.
+        '''
+        with self._cond:
+            if self._closed:
+                return
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+            with self._db_lock:
+                self._db.close()
+
+
+    def __len__(self):
+        self.flush()
+        with self._db_lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM jobs WHERE namespace = ?', (self._namespace,)
+            ).fetchone()[0]
+
+
+    def _query(self, where, params):
+        self.flush()
+        with self._db_lock:
+            rows = self._db.execute(f'SELECT {_COLUMNS} FROM jobs {where}', params).fetchall()
+        return [
+            JobRecord(
+                job_id,
+                file,
+                json.loads(config) if config else None,
+                state,
+                json.loads(result) if result else None,
+                json.loads(offsets) if offsets else None,
+                created,
+                updated,
+            )
+            for job_id, file, config, state, result, offsets, created, updated in rows
+        ]
+
+
+    def _write(self, sql, params, wait=False):
+        done = threading.Event() if wait else None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('JobStore is closed')
+            self._start()
+            self._pending.append((sql, params, done))
+            self._cond.notify()
+        if done is not None:
+            done.wait()
+            if done.error is not None:
+                raise done.error
+
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='ns-job-store', daemon=True)
+            self._thread.start()
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # give updates from other threads a moment to join the batch,
+                # unless someone is waiting for theirs to be committed
+                if not any(done is not None for _, _, done in self._pending):
+                    self._cond.wait(self.flush_interval)
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+            error = None
+            try:
+                with self._db_lock:
+                    with self._db:
+                        for sql, params, _ in batch:
+                            if sql is not None:
+                                self._db.execute(sql, params)
+            except Exception as e:
+                error = e
+            for _, _, done in batch:
+                if done is not None:
+                    done.error = error
+                    done.set()
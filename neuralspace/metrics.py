@@ -0,0 +1,283 @@
+import json
+import time
+import bisect
+import threading
+from collections import namedtuple
+
+
+# upper bounds in seconds of the histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+JOB_BUCKETS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+WS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_HISTOGRAMS = {
+    'neuralspace_request_duration_seconds': ('Time from sending a request to its response headers, retries included.', REQUEST_BUCKETS),
+    'neuralspace_request_queue_seconds': ('Time a request waited for its rate and concurrency limits.', REQUEST_BUCKETS),
+    'neuralspace_job_duration_seconds': ('Time from submitting a transcription job to seeing it completed.', JOB_BUCKETS),
+    'neuralspace_ws_send_seconds': ('Time spent sending one audio chunk on a stream.', WS_BUCKETS),
+    'neuralspace_ws_result_latency_seconds': ('Time from the last audio chunk sent to a stream result received.', WS_BUCKETS),
+}
+_COUNTERS = {
+    'neuralspace_requests_total': 'Requests by endpoint class, method and status.',
+    'neuralspace_request_bytes_sent_total': 'Request body bytes sent.',
+    'neuralspace_request_bytes_received_total': 'Response body bytes received.',
+    'neuralspace_request_retries_total': 'Retried request attempts.',
+    'neuralspace_jobs_failed_total': 'Transcription jobs seen failed.',
+}
+
+
+RequestInfo = namedtuple(
+    'RequestInfo', ['method', 'url', 'endpoint', 'started']
+)
+RequestInfo.__doc__ = '''
+A request in flight, as passed to `pre_request` hooks.\n
+`endpoint` is the endpoint class (`upload`, `poll`, `tts`, `catalog` or
+`other`) and `started` the `time.monotonic()` it was made at.
+'''
+
+
+class _Histogram:
+
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Instrumentation:
+
+
+    def __init__(self, pre_request=None, post_request=None, on_event=None):
+        '''
+        Timing and traffic metrics of a `VoiceAI` client, see `VoiceAI(instrumentation=...)`.\n
+        Collects latency histograms per endpoint class, bytes sent and
+        received, retries, the time from submitting each transcription job to
+        seeing it completed, and streaming send and result latencies. Export
+        them with `prometheus()`, or receive every measurement as a dict with
+        `on_event`. Without an `Instrumentation`, clients skip all of this.
+
+        Parameters
+        ----------
+        pre_request: callable, optional
+            `pre_request(info: RequestInfo)`, called before every request.
+        post_request: callable, optional
+            `post_request(event: dict)`, called after every request with the
+            same `request` event passed to `on_event`.
+        on_event: callable, optional
+            `on_event(event: dict)`, called with every structured event:
+            `request`, `retry`, `job_completed`, `job_failed`, `ws_send` and
+            `ws_result`.
+            See `jsonl_sink` to write them to a file.
+        '''
+        self.pre_request = pre_request
+        self.post_request = post_request
+        self.on_event = on_event
+        self._lock = threading.Lock()
+        # name -> {labels: value or _Histogram}, labels a tuple of (key, value) pairs
+        self._counters = {name: {} for name in _COUNTERS}
+        self._histograms = {name: {} for name in _HISTOGRAMS}
+        # job id -> time.monotonic() of submission
+        self._submitted = {}
+
+
+    def request_started(self, method, url, endpoint) -> RequestInfo:
+        info = RequestInfo(method, url, endpoint, time.monotonic())
+        if self.pre_request is not None:
+            self.pre_request(info)
+        return info
+
+
+    def request_finished(self, info, queued=0.0, response=None, error=None, retries=0, stream=False):
+        '''
+        Record a finished request. `queued` is the time spent waiting for limits.
+        '''
+        duration = time.monotonic() - info.started - queued
+        status = response.status_code if response is not None else type(error).__name__
+        sent = 0
+        received = 0
+        if response is not None:
+            sent = int(response.request.headers.get('Content-Length') or 0)
+            length = response.headers.get('Content-Length')
+            if length is not None:
+                received = int(length)
+            elif not stream:
+                received = len(response.content)
+        endpoint = (('endpoint', info.endpoint),)
+        with self._lock:
+            self._inc('neuralspace_requests_total', endpoint + (('method', info.method), ('status', str(status))))
+            self._inc('neuralspace_request_bytes_sent_total', endpoint, sent)
+            self._inc('neuralspace_request_bytes_received_total', endpoint, received)
+            if retries:
+                self._inc('neuralspace_request_retries_total', endpoint, retries)
+            self._observe('neuralspace_request_duration_seconds', endpoint, duration)
+            self._observe('neuralspace_request_queue_seconds', endpoint, queued)
+        if self.post_request is not None or self.on_event is not None:
+            event = {
+                'event': 'request',
+                'time': time.time(),
+                'method': info.method,
+                'url': info.url,
+                'endpoint': info.endpoint,
+                'status': status,
+                'duration': duration,
+                'queued': queued,
+                'retries': retries,
+                'bytes_sent': sent,
+                'bytes_received': received,
+            }
+            if self.post_request is not None:
+                self.post_request(event)
+            self._emit(event)
+
+
+    def retry(self, method, url, endpoint, attempt, reason):
+        '''
+        Record that a request is about to be retried because of `reason`,
+        a status code or an exception.
+        '''
+        self._emit({
+            'event': 'retry',
+            'time': time.time(),
+            'method': method,
+            'url': url,
+            'endpoint': endpoint,
+            'attempt': attempt,
+            'reason': reason if isinstance(reason, int) else repr(reason),
+        })
+
+
+    def job_submitted(self, job_id):
+        with self._lock:
+            self._submitted[job_id] = time.monotonic()
+
+
+    def job_completed(self, job_id):
+        with self._lock:
+            submitted = self._submitted.pop(job_id, None)
+            if submitted is None:
+                return
+            duration = time.monotonic() - submitted
+            self._observe('neuralspace_job_duration_seconds', (), duration)
+        self._emit({'event': 'job_completed', 'time': time.time(), 'job_id': job_id, 'duration': duration})
+
+
+    def job_failed(self, job_id):
+        with self._lock:
+            submitted = self._submitted.pop(job_id, None)
+            if submitted is None:
+                return
+            duration = time.monotonic() - submitted
+            self._inc('neuralspace_jobs_failed_total', ())
+        self._emit({'event': 'job_failed', 'time': time.time(), 'job_id': job_id, 'duration': duration})
+
+
+    def ws_send(self, seconds, nbytes):
+        with self._lock:
+            self._observe('neuralspace_ws_send_seconds', (), seconds)
+        self._emit({'event': 'ws_send', 'time': time.time(), 'duration': seconds, 'bytes': nbytes})
+
+
+    def ws_result(self, latency):
+        with self._lock:
+            self._observe('neuralspace_ws_result_latency_seconds', (), latency)
+        self._emit({'event': 'ws_result', 'time': time.time(), 'latency': latency})
+
+
+    def snapshot(self):
+        '''
+        All counters and histograms as plain dicts, keyed by metric name,
+        then by a tuple of `(label, value)` pairs.
+        '''
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            histograms = {
+                name: {
+                    labels: {'buckets': dict(zip(h.buckets + (float('inf'),), _cumulative(h.counts))), 'sum': h.sum, 'count': h.count}
+                    for labels, h in values.items()
+                }
+                for name, values in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+
+    def prometheus(self) -> str:
+        '''
+        All metrics in the Prometheus text exposition format.
+        '''
+        snap = self.snapshot()
+        lines = []
+        for name, values in snap['counters'].items():
+            lines.append(f'# HELP {name} {_COUNTERS[name]}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(values.items()):
+                lines.append(f'{name}{_labels(labels)} {value}')
+        for name, values in snap['histograms'].items():
+            lines.append(f'# HELP {name} {_HISTOGRAMS[name][0]}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, h in sorted(values.items()):
+                for le, count in h['buckets'].items():
+                    le = '+Inf' if le == float('inf') else repr(float(le))
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {h["sum"]}')
+                lines.append(f'{name}_count{_labels(labels)} {h["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+    def _inc(self, name, labels, value=1):
+        values = self._counters[name]
+        values[labels] = values.get(labels, 0) + value
+
+
+    def _observe(self, name, labels, value):
+        values = self._histograms[name]
+        h = values.get(labels)
+        if h is None:
+            h = values[labels] = _Histogram(_HISTOGRAMS[name][1])
+        h.observe(value)
+
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+def jsonl_sink(fp):
+    '''
+    `on_event` callback writing every event as a line of JSON to the text file `fp`.
+    '''
+    lock = threading.Lock()
+
+    def write(event):
+        line = json.dumps(event, default=str)
+        with lock:
+            fp.write(line + '\n')
+
+    return write
+
+
+def _cumulative(counts):
+    total = 0
+    out = []
+    for c in counts:
+        total += c
+        out.append(total)
+    return out
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return '{' + inner + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
@@ -0,0 +1,219 @@
+import io
+import time
+from uuid import uuid4
+from pathlib import Path
+from collections import namedtuple
+
+
+CHUNK_SIZE = 256 * 1024
+
+
+UploadProgress = namedtuple(
+    'UploadProgress', ['bytes_sent', 'total_bytes', 'elapsed', 'bytes_per_second']
+)
+UploadProgress.__doc__ = '''
+Snapshot of an upload, passed to upload progress callbacks.\n
+`total_bytes` is None when the size of the body is not known up front.
+'''
+
+
+class MultipartEncoder:
+
+
+    def __init__(self, fields, files, chunk_size: int = CHUNK_SIZE, on_progress=None):
+        '''
+        Streaming `multipart/form-data` body.\n
+        Nothing is assembled in memory: file paths and file objects are read
+        in `chunk_size` pieces while the request is being sent, and `bytes`,
+        `memoryview` or any other buffer is sliced without copying.
+        Can be given directly as `data` to `requests`, which then sends it
+        with a `Content-Length` header when the size is known.
+
+        Parameters
+        ----------
+        fields: dict
+            Plain form fields, name to str value.
+        files: dict
+            File fields, name to `(filename, content, content_type)` tuples.\n
+            content can be a path, a binary file object, or a buffer.
+        chunk_size: int
+            Size of each read from files.
+        on_progress: callback, optional
+            Called with an `UploadProgress` after every chunk is handed out.
+        '''
+        self.boundary = uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.bytes_sent = 0
+        self._started = None
+        self._opened = []
+
+        parts = []
+        for name, value in fields.items():
+            parts.append(_BufferSource(self._part_header(name).encode() + str(value).encode() + b'\r\n'))
+        for name, (filename, content, content_type) in files.items():
+            parts.append(_BufferSource(self._part_header(name, filename, content_type).encode()))
+            parts.append(self._source(content))
+            parts.append(_BufferSource(b'\r\n'))
+        parts.append(_BufferSource(f'--{self.boundary}--\r\n'.encode()))
+        self._parts = parts
+        self._current = 0
+
+        total = 0
+        for p in parts:
+            if p.len is None:
+                total = None
+                break
+            total += p.len
+        self.len = total
+
+
+    def __len__(self):
+        if self.len is None:
+            raise TypeError('Size of the multipart body is unknown')
+        return self.len
+
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+    def read(self, size: int = -1):
+        '''
+        Returns the next piece of the body, at most `size` bytes.\n
+        Pieces never span two parts, so they may be shorter than `size`.
+        An empty result means the body is exhausted.
+        '''
+        if self._started is None:
+            self._started = time.monotonic()
+        if size is None or size < 0:
+            size = self.chunk_size
+        while self._current < len(self._parts):
+            chunk = self._parts[self._current].read(size)
+            if chunk:
+                self.bytes_sent += len(chunk)
+                if self.on_progress is not None:
+                    self.on_progress(self.progress())
+                return chunk
+            self._current += 1
+        return b''
+
+
+    @property
+    def rewindable(self):
+        return all(p.rewindable for p in self._parts)
+
+
+    def rewind(self):
+        '''
+        Start the body over, e.g. to resend it on retry.
+        '''
+        for p in self._parts:
+            p.rewind()
+        self._current = 0
+        self.bytes_sent = 0
+        self._started = None
+
+
+    def progress(self) -> UploadProgress:
+        '''
+        Current upload statistics.
+        '''
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = time.monotonic() - self._started
+        bps = self.bytes_sent / elapsed if elapsed > 0 else 0.0
+        return UploadProgress(self.bytes_sent, self.len, elapsed, bps)
+
+
+    def close(self):
+        '''
+        Close files opened by the encoder. Caller-provided file objects are left open.\n
+        The body cannot be read or rewound afterwards.
+        '''
+        for fp in self._opened:
+            fp.close()
+        self._opened = []
+
+
+    def _part_header(self, name, filename=None, content_type=None):
+        hdr = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"'
+        if filename is not None:
+            hdr += f'; filename="{filename}"'
+        hdr += '\r\n'
+        if content_type is not None:
+            hdr += f'Content-Type: {content_type}\r\n'
+        return hdr + '\r\n'
+
+
+    def _source(self, content):
+        if isinstance(content, (str, Path)):
+            fp = open(content, 'rb', buffering=0)
+            self._opened.append(fp)
+            return _FileSource(fp)
+        if isinstance(content, io.IOBase):
+            return _FileSource(content)
+        return _BufferSource(content)
+
+
+class _BufferSource:
+
+    rewindable = True
+
+
+    def __init__(self, buf):
+        self._view = memoryview(buf).cast('B')
+        self._pos = 0
+        self.len = self._view.nbytes
+
+
+    def rewind(self):
+        self._pos = 0
+
+
+    def read(self, size):
+        chunk = self._view[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+
+class _FileSource:
+
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._start = None
+        self.len = None
+        try:
+            if fp.seekable():
+                self._start = fp.tell()
+                end = fp.seek(0, io.SEEK_END)
+                fp.seek(self._start)
+                self.len = end - self._start
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+        self.rewindable = self._start is not None
+        self._remaining = self.len
+
+
+    def rewind(self):
+        self._fp.seek(self._start)
+        self._remaining = self.len
+
+
+    def read(self, size):
+        if self._remaining is not None:
+            if self._remaining <= 0:
+                return b''
+            size = min(size, self._remaining)
+        chunk = self._fp.read(size)
+        if not chunk:
+            return b''
+        if self._remaining is not None:
+            self._remaining -= len(chunk)
+        return chunk
@@ -0,0 +1,227 @@
+import os
+import time
+import itertools
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from neuralspace import constants as K
+
+
+class RateLimiter:
+
+
+    def __init__(self, rate: float, burst: float = None):
+        '''
+        Token bucket limiting how often something happens, shared by all
+        threads that use it.
+
+        Parameters
+        ----------
+        rate: float
+            Tokens added per second, i.e. the sustained rate.
+        burst: float, optional
+            Most tokens that can pile up while idle, i.e. how many calls may
+            go through at once after a pause. Defaults to `max(1, rate)`.
+        '''
+        if rate <= 0:
+            raise ValueError(f'rate must be positive, got {rate}')
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+
+    def acquire(self, tokens: float = 1) -> float:
+        '''
+        Take `tokens`, sleeping until they are available.\n
+        Returns the time spent waiting, in seconds.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # reserve the tokens now, possibly going into debt, so that
+            # waiting threads are served in the order they arrived
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+# endpoint classes requests are limited by, see `utils.endpoint_class`
+ENDPOINT_CLASSES = ('upload', 'poll', 'tts', 'catalog', 'other')
+
+Limit = namedtuple('Limit', ['rate', 'burst', 'max_in_flight'], defaults=[None, None, None])
+Limit.__doc__ = '''
+Limits of one endpoint class of a `Governor`.\n
+`rate` is requests started per second and `burst` how many may start at
+once after a pause (see `RateLimiter`), `max_in_flight` the most requests
+running at the same time. None means unlimited.
+'''
+
+
+class Governor:
+
+
+    def __init__(self, limits=None, shared: bool = False, path=None):
+        '''
+        Rate and concurrency limits per endpoint class, for every request of
+        the `VoiceAI` instances it is given to.\n
+        Share one `Governor` between all clients of a process to keep them
+        within one quota together. With `shared`, the limits also hold across
+        all processes on the host that use the same `path`.
+        ```
+        gov = Governor({
+            'upload': Limit(rate=5, max_in_flight=4),
+            'poll': Limit(rate=50),
+            'tts': Limit(rate=20, max_in_flight=16),
+        }, shared=True)
+        vai = VoiceAI(governor=gov)
+        ```
+
+        Parameters
+        ----------
+        limits: dict, optional
+            `Limit` of each endpoint class: `upload`, `poll`, `tts`,
+            `catalog` or `other`. Classes not given are unlimited.
+        shared: bool
+            Keep the token buckets and in-flight slots in lock files, so
+            that every process using them shares the limits. POSIX only.
+        path: str or Path, optional
+            Directory of the lock files. Defaults to `NS_HOME/limits`.
+        '''
+        limits = dict(limits or {})
+        unknown = set(limits) - set(ENDPOINT_CLASSES)
+        if unknown:
+            raise ValueError(f'Unknown endpoint classes {sorted(unknown)}, expected some of {ENDPOINT_CLASSES}')
+        if shared and fcntl is None:
+            raise ValueError('shared limits need fcntl, which is not available on this platform')
+        self.limits = limits
+        self.shared = shared
+        self.path = str(path) if path is not None else str(K.NS_HOME / 'limits')
+        self._buckets = {}
+        self._slots = {}
+        for cls, limit in limits.items():
+            if not isinstance(limit, Limit):
+                limit = Limit(**limit)
+                limits[cls] = limit
+            if limit.rate is not None:
+                if shared:
+                    self._buckets[cls] = _FileBucket(self._file(cls, 'bucket'), limit.rate, limit.burst)
+                else:
+                    self._buckets[cls] = RateLimiter(limit.rate, limit.burst)
+            if limit.max_in_flight is not None:
+                if limit.max_in_flight < 1:
+                    raise ValueError(f'max_in_flight of {cls} must be at least 1, got {limit.max_in_flight}')
+                if shared:
+                    self._slots[cls] = _FileSemaphore(self._file(cls, 'slot'), limit.max_in_flight)
+                else:
+                    self._slots[cls] = threading.BoundedSemaphore(limit.max_in_flight)
+
+
+    @contextmanager
+    def limit(self, endpoint_class: str):
+        '''
+        Context manager around one attempt of a request of `endpoint_class`:
+        waits for a token and an in-flight slot, and frees the slot on exit.
+        Every retry takes a token of its own.
+        '''
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is not None:
+            bucket.acquire()
+        slots = self._slots.get(endpoint_class)
+        if slots is None:
+            yield
+            return
+        slot = slots.acquire()
+        try:
+            yield
+        finally:
+            if isinstance(slots, _FileSemaphore):
+                slots.release(slot)
+            else:
+                slots.release()
+
+
+    def _file(self, endpoint_class, kind):
+        os.makedirs(self.path, exist_ok=True)
+        return os.path.join(self.path, f'{endpoint_class}.{kind}')
+
+
+class _FileBucket:
+
+
+    def __init__(self, file, rate, burst=None):
+        '''
+        Token bucket whose state lives in `file`, updated under `flock`, so
+        that all processes using the file share it.
+        '''
+        if rate <= 0:
+            raise ValueError(f'rate must be positive, got {rate}')
+        self.file = file
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+
+
+    def acquire(self, tokens: float = 1) -> float:
+        fd = os.open(self.file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 64, 0)
+            # wall-clock time, the only clock all processes agree on
+            now = time.time()
+            try:
+                level, updated = map(float, raw.split())
+            except ValueError:
+                level, updated = self.burst, now
+            level = min(self.burst, level + max(0.0, now - updated) * self.rate) - tokens
+            state = f'{level!r} {now!r}'.encode().ljust(64)
+            os.pwrite(fd, state, 0)
+        finally:
+            os.close(fd)
+        wait = -level / self.rate if level < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class _FileSemaphore:
+
+
+    def __init__(self, file, size):
+        '''
+        `size` slots, one lock file each, shared by all processes using them.
+        A slot held by a process that dies is freed by the OS with its lock.
+        '''
+        self.files = [f'{file}{i}' for i in range(size)]
+        self._next = itertools.count()
+
+
+    def acquire(self):
+        delay = 0.001
+        while True:
+            start = next(self._next)
+            for i in range(len(self.files)):
+                file = self.files[(start + i) % len(self.files)]
+                fd = os.open(file, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                return fd
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+
+    def release(self, fd):
+        # closing the file drops the lock
+        os.close(fd)
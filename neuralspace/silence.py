@@ -0,0 +1,223 @@
+import io
+import bisect
+from pathlib import Path
+
+from neuralspace import audio
+
+
+# keys holding times in seconds in transcription results
+TIME_KEYS = frozenset(['start', 'end', 'startTime', 'endTime', 'start_time', 'end_time'])
+END_KEYS = frozenset(['end', 'endTime', 'end_time'])
+
+
+class OffsetMap:
+
+
+    def __init__(self, segments):
+        '''
+        Maps times in trimmed audio back onto the original timeline.
+
+        Parameters
+        ----------
+        segments: list of (trimmed_start, original_start) tuples
+            Start of every kept segment, in seconds, in both timelines.
+            Sorted by `trimmed_start`.
+        '''
+        self.segments = list(segments)
+        self._starts = [s for s, _ in self.segments]
+
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        '''
+        Original time of time `t` of the trimmed audio.\n
+        A time exactly on a cut maps to the start of the following segment,
+        or with `end` to the end of the preceding one, so that end times
+        touching a cut never jump across the removed silence.
+        '''
+        i = bisect.bisect_right(self._starts, t) - 1
+        if end and i > 0 and t == self._starts[i]:
+            i -= 1
+        if i < 0:
+            return t
+        trimmed_start, original_start = self.segments[i]
+        return original_start + (t - trimmed_start)
+
+
+    def apply(self, obj):
+        '''
+        Shift all timestamps (`start`, `end`, `startTime`, ...) found anywhere
+        in a transcription result, in place. Returns `obj`.
+        '''
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if k in TIME_KEYS and isinstance(v, (int, float)) and not isinstance(v, bool):
+                    obj[k] = round(self.to_original(v, end=k in END_KEYS), 3)
+                else:
+                    self.apply(v)
+        elif isinstance(obj, list):
+            for v in obj:
+                self.apply(v)
+        return obj
+
+
+class SilenceTrimmer:
+
+
+    def __init__(
+        self,
+        threshold_db: float = -45,
+        min_silence: float = 1.0,
+        padding: float = 0.25,
+        frame_duration: float = 0.02,
+    ):
+        '''
+        Energy based voice activity detection that cuts long silences out of
+        audio before it is uploaded, see `VoiceAI.transcribe(trim_silence=...)`.
+
+        Parameters
+        ----------
+        threshold_db: float
+            Frames quieter than this RMS level, in dBFS, count as silence.
+        min_silence: float
+            Only silences of at least this many seconds are cut.
+        padding: float
+            Seconds of silence kept on each side of a cut, so word edges survive.
+        frame_duration: float
+            Analysis window in seconds.
+        '''
+        if min_silence <= 2 * padding:
+            raise ValueError('min_silence must be more than twice the padding')
+        self.threshold_db = threshold_db
+        self.min_silence = min_silence
+        self.padding = padding
+        self.frame_duration = frame_duration
+
+
+    def trim(self, samples, rate: int):
+        '''
+        Cut long silences out of `samples` (shape `(frames, channels)`).
+
+        Returns
+        -------
+        trimmed: np.ndarray
+            Remaining samples, same dtype and channels.
+        offsets: OffsetMap
+            Maps times in `trimmed` back to times in `samples`.
+        '''
+        np = audio.np
+        mono = audio.downmix(samples)
+        hop = max(1, int(rate * self.frame_duration))
+        n = len(mono) // hop
+        if n == 0:
+            return samples, OffsetMap([(0.0, 0.0)])
+
+        # RMS level of each frame, in dBFS
+        frames = mono[:n * hop].reshape(n, hop)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        db = 20 * np.log10(np.maximum(rms, 1e-10))
+        silent = db < self.threshold_db
+
+        # runs of silent frames: starts and ends of every run
+        edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+
+        min_frames = int(np.ceil(self.min_silence / self.frame_duration))
+        pad = int(round(self.padding * rate))
+        total = len(samples)
+        cuts = []
+        for s, e in zip(run_starts, run_ends):
+            if e - s < min_frames:
+                continue
+            start = s * hop + pad if s > 0 else 0
+            end = e * hop - pad if e < n else total
+            if end > start:
+                cuts.append((start, end))
+
+        if not cuts:
+            return samples, OffsetMap([(0.0, 0.0)])
+
+        keep = []
+        pos = 0
+        for start, end in cuts:
+            if start > pos:
+                keep.append((pos, start))
+            pos = end
+        if pos < total:
+            keep.append((pos, total))
+        if not keep:
+            # nothing but silence, leave it to the server
+            return samples, OffsetMap([(0.0, 0.0)])
+
+        segments = []
+        trimmed_pos = 0
+        for start, end in keep:
+            segments.append((float(trimmed_pos / rate), float(start / rate)))
+            trimmed_pos += end - start
+        trimmed = np.concatenate([samples[start:end] for start, end in keep])
+        return trimmed, OffsetMap(segments)
+
+
+    def trim_file(self, file):
+        '''
+        Trim a WAV file given as a path, buffer or file object.
+
+        Returns
+        -------
+        result: tuple or None
+            `(wav_bytes, OffsetMap)`, or None when `file` is not a WAV file
+            or has no silence long enough to cut.
+        '''
+        # only read the whole file once its header says it is a WAV file
+        if isinstance(file, io.IOBase):
+            pos = file.tell() if file.seekable() else None
+            if pos is not None:
+                head = file.read(12)
+                file.seek(pos)
+                if not _is_wav(head):
+                    return None
+            data = file.read()
+            if pos is not None:
+                file.seek(pos)
+        elif isinstance(file, (str, Path)):
+            with open(file, 'rb') as fp:
+                if not _is_wav(fp.read(12)):
+                    return None
+                fp.seek(0)
+                data = fp.read()
+        else:
+            data = file
+        if not _is_wav(bytes(memoryview(data)[:12])):
+            return None
+        samples, rate = audio.read_wav(data)
+        trimmed, offsets = self.trim(samples, rate)
+        if len(trimmed) == len(samples):
+            return None
+        return write_wav(audio.to_int16(trimmed), rate), offsets
+
+
+def _is_wav(head):
+    return head[:4] == b'RIFF' and head[8:12] == b'WAVE'
+
+
+def write_wav(samples, rate: int) -> bytes:
+    '''
+    Encode int16 samples of shape `(frames, channels)` as a WAV file.
+    '''
+    channels = samples.shape[1] if samples.ndim > 1 else 1
+    data = samples.astype('<i2', copy=False).tobytes()
+    out = io.BytesIO()
+    out.write(b'RIFF')
+    out.write((36 + len(data)).to_bytes(4, 'little'))
+    out.write(b'WAVEfmt ')
+    out.write((16).to_bytes(4, 'little'))
+    out.write((1).to_bytes(2, 'little'))
+    out.write(channels.to_bytes(2, 'little'))
+    out.write(rate.to_bytes(4, 'little'))
+    out.write((rate * channels * 2).to_bytes(4, 'little'))
+    out.write((channels * 2).to_bytes(2, 'little'))
+    out.write((16).to_bytes(2, 'little'))
+    out.write(b'data')
+    out.write(len(data).to_bytes(4, 'little'))
+    out.write(data)
+    return out.getvalue()
@@ -0,0 +1,215 @@
+import time
+import threading
+from collections import deque
+
+
+class StreamPool:
+
+
+    def __init__(self, size: int = 2, max_idle: float = 20, min_remaining: float = 30, max_unused: float = 300):
+        '''
+        Keeps authenticated streaming websocket connections open and ready,
+        so that `VoiceAI.stream()` can hand one out without any connection
+        setup (token request, TCP and TLS handshakes).\n
+        Connections are pooled per set of stream parameters (language, audio
+        format, VAD settings, ...). Every set of parameters registered with
+        `warm()`, or used with `stream()` in the last `max_unused` seconds,
+        is kept topped up to `size` ready connections by a background thread.
+
+        Parameters
+        ----------
+        size: int
+            Ready connections kept per set of stream parameters.
+        max_idle: float
+            Seconds a ready connection may sit unused before it is replaced,
+            to stay clear of server side idle timeouts.
+        min_remaining: float
+            Connections whose token has fewer seconds left than this are
+            replaced instead of handed out.
+        max_unused: float
+            Seconds after its last `stream()` that a set of parameters not
+            registered with `warm()` stops being kept warm, and its ready
+            connections are closed.
+        '''
+        self.size = max(1, size)
+        self.max_idle = max_idle
+        self.min_remaining = min_remaining
+        self.max_unused = max_unused
+        self._connect = None
+        self._cond = threading.Condition()
+        # key -> (params, deque of (connected_at, expires_at, ws))
+        self._pools = {}
+        # key -> time.monotonic() it was last registered or acquired
+        self._used = {}
+        # keys registered with warm(), which never expire
+        self._warm = set()
+        self._thread = None
+        self._closed = False
+
+
+    def bind(self, connect):
+        '''
+        Set the function used to open a connection,
+        `connect(params) -> (ws, expires_at)` with `expires_at` on the `time.monotonic()` clock.
+        '''
+        self._connect = connect
+
+
+    def warm(self, **params):
+        '''
+        Start keeping connections ready for the given `stream()` parameters.
+        '''
+        with self._cond:
+            self._register(params, pin=True)
+            self._start()
+            self._cond.notify()
+
+
+    def acquire(self, params):
+        '''
+        A ready connection for `params`, or None when there is none yet.\n
+        Either way, `params` is kept warm for the next `max_unused` seconds.
+        '''
+        stale = []
+        ws = None
+        with self._cond:
+            if self._closed:
+                return None
+            _, conns = self._register(params)
+            stale = self._evict(conns)
+            if conns:
+                ws = conns.popleft()[2]
+            self._start()
+            self._cond.notify()
+        _close_all(stale)
+        return ws
+
+
+    def close(self):
+        '''
+        Close all ready connections and stop replenishing.
+        '''
+        with self._cond:
+            self._closed = True
+            conns = [ws for _, pool in self._pools.values() for _, _, ws in pool]
+            self._pools.clear()
+            self._used.clear()
+            self._warm.clear()
+            self._cond.notify()
+        _close_all(conns)
+
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(pool) for _, pool in self._pools.values())
+
+
+    def _register(self, params, pin=False):
+        key = _key(params)
+        if key not in self._pools:
+            self._pools[key] = (dict(params), deque())
+        if pin:
+            self._warm.add(key)
+        self._used[key] = time.monotonic()
+        return self._pools[key]
+
+
+    def _expire(self):
+        '''
+        Drop sets of parameters not used for `max_unused` seconds, unless
+        registered with `warm()`. Returns their connections, to be closed
+        outside the lock, and when the next set expires.
+        '''
+        now = time.monotonic()
+        stale = []
+        wake = None
+        for key, used in list(self._used.items()):
+            if key in self._warm:
+                continue
+            if now - used > self.max_unused:
+                _, conns = self._pools.pop(key)
+                del self._used[key]
+                stale += [ws for _, _, ws in conns]
+            else:
+                deadline = used + self.max_unused
+                wake = deadline if wake is None else min(wake, deadline)
+        return stale, wake
+
+
+    def _evict(self, conns):
+        '''
+        Remove connections that are idle for too long, close to expiry, or
+        closed by the server. Returns them so they can be closed outside the lock.
+        '''
+        now = time.monotonic()
+        keep = []
+        stale = []
+        for entry in conns:
+            connected_at, expires_at, ws = entry
+            if now - connected_at > self.max_idle or \
+                    expires_at - now < self.min_remaining or \
+                    not ws.connected:
+                stale.append(ws)
+            else:
+                keep.append(entry)
+        conns.clear()
+        conns.extend(keep)
+        return stale
+
+
+    def _start(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name='ns-stream-pool', daemon=True)
+            self._thread.start()
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                stale, wake = self._expire()
+                todo = None
+                for params, conns in self._pools.values():
+                    stale += self._evict(conns)
+                    if todo is None and len(conns) < self.size:
+                        todo = (params, conns)
+                    for connected_at, expires_at, _ in conns:
+                        deadline = min(connected_at + self.max_idle, expires_at - self.min_remaining)
+                        wake = deadline if wake is None else min(wake, deadline)
+                if todo is None and not stale:
+                    timeout = None if wake is None else max(0, wake - time.monotonic())
+                    self._cond.wait(timeout)
+                    continue
+            _close_all(stale)
+            if todo is None:
+                continue
+
+            params, conns = todo
+            try:
+                ws, expires_at = self._connect(params)
+            except Exception:
+                # stream() falls back to connecting itself and surfaces the error
+                with self._cond:
+                    self._cond.wait(1)
+                continue
+            with self._cond:
+                if self._closed or self._pools.get(_key(params), (None, None))[1] is not conns:
+                    # closed, or the parameters expired while connecting
+                    stale = [ws]
+                else:
+                    conns.append((time.monotonic(), expires_at, ws))
+                    stale = []
+            _close_all(stale)
+
+
+def _key(params):
+    return tuple(sorted(params.items()))
+
+
+def _close_all(conns):
+    for ws in conns:
+        try:
+            ws.close()
+        except Exception:
+            pass
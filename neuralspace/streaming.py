@@ -0,0 +1,320 @@
+import json
+import time
+import queue
+import threading
+from collections import deque, namedtuple
+
+import websocket
+
+from neuralspace import utils
+
+
+StreamResult = namedtuple('StreamResult', ['text', 'full', 'data', 'latency'])
+StreamResult.__doc__ = '''
+One message received from a streaming session.\n
+`full` is True for final results and False for partial ones, `data` is the
+whole parsed message, and `latency` is the time in seconds between the most
+recent audio chunk being sent and this result arriving.
+'''
+
+BACKPRESSURE = ('block', 'drop_oldest')
+
+_END = object()
+
+
+class StreamTranscriber:
+
+
+    def __init__(
+        self,
+        vai,
+        language_id: str,
+        audio=None,
+        queue_size: int = 64,
+        backpressure: str = 'block',
+        linger: float = 2.0,
+        **stream_kwargs,
+    ):
+        '''
+        Duplex streaming transcription on top of `VoiceAI.stream()`.\n
+        Audio is sent from one thread and results are received on another,
+        so a slow `recv` never holds up sending, and vice versa.
+        ```
+        with StreamTranscriber(vai, 'en', audio_chunks) as st:
+            for res in st:
+                print(res.text, res.full)
+        print(st.stats())
+        ```
+
+        Parameters
+        ----------
+        vai: VoiceAI
+            Client used to open the stream.
+        language_id: str
+            2-letter ISO language code.
+        audio: iterable of bytes, optional
+            Audio chunks in the stream's `audio_format`, read on a background
+            thread. If omitted, push chunks with `feed()` and call `finish()`
+            at the end, e.g. from a microphone callback.
+        queue_size: int
+            Maximum number of chunks waiting to be sent.
+        backpressure: str
+            What happens when the send queue is full: `block` waits for room,
+            `drop_oldest` discards the oldest waiting chunk to keep real-time pace.
+        linger: float
+            Seconds to keep receiving after the last chunk is sent, waiting for
+            the final results, before the session is closed.
+        **stream_kwargs:
+            Passed on to `VoiceAI.stream()`, e.g. `audio_format='pcm_8k'`.
+        '''
+        if backpressure not in BACKPRESSURE:
+            raise ValueError(f'backpressure must be one of {BACKPRESSURE}, got {backpressure!r}')
+        self._vai = vai
+        self._metrics = getattr(vai, '_metrics', None)
+        self.language_id = language_id
+        self.audio = audio
+        self.backpressure = backpressure
+        self.linger = linger
+        self._stream_kwargs = stream_kwargs
+
+        self._send_q = queue.Queue(maxsize=queue_size)
+        self._results = queue.Queue()
+        self._cm = None
+        self._ws = None
+        self._threads = []
+        self._error = None
+        self._finished = False
+        self._aborted = False
+        self._started = False
+        self._recv_done = threading.Event()
+        self._lock = threading.Lock()
+
+        self._last_send = None
+        self._last_activity = time.monotonic()
+        self.chunks_sent = 0
+        self.bytes_sent = 0
+        self.chunks_dropped = 0
+        self.results_received = 0
+        self._send_latencies = deque(maxlen=100000)
+        self._result_latencies = deque(maxlen=100000)
+
+
+    def start(self):
+        '''
+        Open the stream and start the sender and receiver threads.\n
+        Called automatically when iterating or entering the context manager.
+        '''
+        if self._started:
+            return self
+        self._started = True
+        self._cm = self._vai.stream(self.language_id, **self._stream_kwargs)
+        self._ws = self._cm.__enter__()
+        self._last_activity = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._send_loop, name='ns-stream-send', daemon=True),
+            threading.Thread(target=self._recv_loop, name='ns-stream-recv', daemon=True),
+        ]
+        if self.audio is not None:
+            self._threads.append(
+                threading.Thread(target=self._feed_loop, name='ns-stream-feed', daemon=True)
+            )
+        for t in self._threads:
+            t.start()
+        return self
+
+
+    def feed(self, chunk):
+        '''
+        Queue an audio chunk for sending, applying the backpressure policy.
+        '''
+        if self._finished:
+            raise RuntimeError('feed() called after finish()')
+        self._put(chunk)
+
+
+    def finish(self):
+        '''
+        Mark the end of the audio. Results keep arriving until the session closes.
+        '''
+        if not self._finished:
+            self._finished = True
+            self._send_q.put(_END)
+
+
+    def results(self):
+        '''
+        Generator of `StreamResult`s, partial and final, ending when the session closes.\n
+        Re-raises any error from the background threads.
+        '''
+        self.start()
+        while True:
+            item = self._results.get()
+            if item is _END:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
+
+
+    def __iter__(self):
+        return self.results()
+
+
+    def close(self):
+        '''
+        Stop sending, close the session and wait for the threads to finish.
+        '''
+        if not self._started:
+            return
+        self.finish()
+        for t in self._threads:
+            t.join()
+        if self._cm is not None:
+            cm, self._cm = self._cm, None
+            try:
+                cm.__exit__(None, None, None)
+            except Exception:
+                pass
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            # stop right away instead of waiting for the audio to run out
+            self._abort()
+        self.close()
+
+
+    def stats(self):
+        '''
+        Counters plus percentiles (in seconds) of the time spent in each send,
+        and of the latency of results.
+        '''
+        with self._lock:
+            return {
+                'chunks_sent': self.chunks_sent,
+                'bytes_sent': self.bytes_sent,
+                'chunks_dropped': self.chunks_dropped,
+                'results_received': self.results_received,
+                'send_latency': utils.percentiles(self._send_latencies),
+                'result_latency': utils.percentiles(self._result_latencies),
+            }
+
+
+    def _put(self, chunk):
+        if self.backpressure == 'block':
+            self._send_q.put(chunk)
+            return
+        while True:
+            try:
+                self._send_q.put_nowait(chunk)
+                return
+            except queue.Full:
+                try:
+                    self._send_q.get_nowait()
+                    with self._lock:
+                        self.chunks_dropped += 1
+                except queue.Empty:
+                    pass
+
+
+    def _feed_loop(self):
+        try:
+            for chunk in self.audio:
+                if self._finished:
+                    return
+                self._put(chunk)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.finish()
+
+
+    def _send_loop(self):
+        ws = self._ws
+        try:
+            while True:
+                chunk = self._send_q.get()
+                if chunk is _END:
+                    break
+                t = time.monotonic()
+                ws.send_binary(chunk)
+                now = time.monotonic()
+                with self._lock:
+                    self.chunks_sent += 1
+                    self.bytes_sent += len(chunk)
+                    self._send_latencies.append(now - t)
+                    self._last_send = now
+                    self._last_activity = now
+                if self._metrics is not None:
+                    self._metrics.ws_send(now - t, len(chunk))
+            if self._aborted:
+                return
+            # give the server time to return the last results
+            while self._error is None and not self._aborted:
+                idle = time.monotonic() - self._last_activity
+                if idle >= self.linger:
+                    break
+                time.sleep(min(0.05, self.linger - idle))
+            ws.send_close()
+            # the receiver stops once the server acknowledges the close
+            if not self._recv_done.wait(max(self.linger, 5)):
+                self._abort()
+        except Exception as e:
+            if not self._aborted:
+                self._fail(e)
+            self._abort()
+
+
+    def _recv_loop(self):
+        ws = self._ws
+        try:
+            while True:
+                opcode, data = ws.recv_data()
+                if opcode == websocket.ABNF.OPCODE_CLOSE:
+                    break
+                if opcode != websocket.ABNF.OPCODE_TEXT:
+                    continue
+                now = time.monotonic()
+                msg = json.loads(data)
+                with self._lock:
+                    latency = None if self._last_send is None else now - self._last_send
+                    if latency is not None:
+                        self._result_latencies.append(latency)
+                    self.results_received += 1
+                    self._last_activity = now
+                if self._metrics is not None and latency is not None:
+                    self._metrics.ws_result(latency)
+                self._results.put(StreamResult(msg.get('text', ''), bool(msg.get('full')), msg, latency))
+        except websocket.WebSocketConnectionClosedException:
+            pass
+        except Exception as e:
+            if not self._aborted:
+                self._fail(e)
+        finally:
+            self._recv_done.set()
+            self._results.put(_END)
+
+
+    def _fail(self, e):
+        if self._error is None:
+            self._error = e
+
+
+    def _abort(self):
+        self._aborted = True
+        self._finished = True
+        # unblock the feeder, the sender and the receiver
+        while True:
+            try:
+                self._send_q.get_nowait()
+            except queue.Empty:
+                break
+        self._send_q.put(_END)
+        try:
+            self._ws.shutdown()
+        except Exception:
+            pass
@@ -0,0 +1,156 @@
+import time
+import threading
+from collections import deque
+
+from neuralspace import constants as K
+
+
+class TokenManager:
+
+
+    def __init__(
+        self,
+        duration: float = K.timeout,
+        pool_size: int = 2,
+        min_remaining: float = 30,
+        reuse: bool = False,
+    ):
+        '''
+        Keeps short-lived streaming tokens ready ahead of `VoiceAI.stream()`,
+        so that opening a stream only costs the websocket handshake.\n
+        A background thread keeps up to `pool_size` tokens that still have
+        at least `min_remaining` seconds to live, and replaces tokens before
+        they get too old to use.
+
+        Parameters
+        ----------
+        duration: float
+            Lifetime in seconds requested for each token. Streams opened with
+            a different `timeout` fetch their own token as before.
+        pool_size: int
+            Number of tokens kept ready, to absorb bursts of new streams.
+        min_remaining: float
+            Tokens with fewer seconds left than this are never handed out.
+        reuse: bool
+            Hand the same token to many streams until it gets too old,
+            instead of using every token once.
+        '''
+        if min_remaining >= duration:
+            raise ValueError(
+                f'min_remaining ({min_remaining}) must be less than duration ({duration})'
+            )
+        self.duration = duration
+        self.pool_size = max(1, pool_size)
+        self.min_remaining = min_remaining
+        self.reuse = reuse
+        self._fetch = None
+        self._cond = threading.Condition()
+        # (expires_at, token), oldest first
+        self._tokens = deque()
+        self._thread = None
+        self._closed = False
+
+
+    def bind(self, fetch):
+        '''
+        Set the function used to fetch a new token, `fetch(duration) -> str`.
+        '''
+        self._fetch = fetch
+
+
+    def acquire(self) -> str:
+        '''
+        A token with at least `min_remaining` seconds to live.\n
+        Served from the pool when possible, otherwise fetched right away.
+        '''
+        return self.acquire_entry()[1]
+
+
+    def acquire_entry(self):
+        '''
+        Like `acquire()`, but returns `(expires_at, token)` with `expires_at`
+        on the `time.monotonic()` clock.
+        '''
+        with self._cond:
+            self._start()
+            self._drop_stale()
+            if self._tokens:
+                if self.reuse:
+                    entry = self._tokens[-1]
+                else:
+                    entry = self._tokens.popleft()
+                    self._cond.notify()
+                return entry
+            self._cond.notify()
+        return self._new_token()
+
+
+    def prefetch(self):
+        '''
+        Fill the pool now, blocking until it is full.
+        '''
+        with self._cond:
+            self._drop_stale()
+            missing = self.pool_size - len(self._tokens)
+        for _ in range(missing):
+            entry = self._new_token()
+            with self._cond:
+                self._tokens.append(entry)
+        with self._cond:
+            self._start()
+
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._tokens.clear()
+            self._cond.notify()
+
+
+    def __len__(self):
+        with self._cond:
+            self._drop_stale()
+            return len(self._tokens)
+
+
+    def _new_token(self):
+        if self._fetch is None:
+            raise RuntimeError('TokenManager is not bound to a VoiceAI instance')
+        # taken before the request, so the expiry is never overestimated
+        expires_at = time.monotonic() + self.duration
+        token = self._fetch(self.duration)
+        return (expires_at, token)
+
+
+    def _drop_stale(self):
+        limit = time.monotonic() + self.min_remaining
+        while self._tokens and self._tokens[0][0] <= limit:
+            self._tokens.popleft()
+
+
+    def _start(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name='ns-tokens', daemon=True)
+            self._thread.start()
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    self._drop_stale()
+                    if len(self._tokens) < self.pool_size:
+                        break
+                    # sleep until the oldest token becomes stale
+                    self._cond.wait(self._tokens[0][0] - self.min_remaining - time.monotonic())
+            try:
+                entry = self._new_token()
+            except Exception:
+                # the next acquire() fetches synchronously and surfaces the error
+                with self._cond:
+                    self._cond.wait(1)
+                continue
+            with self._cond:
+                self._tokens.append(entry)
@@ -0,0 +1,192 @@
+import time
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from neuralspace import constants as K
+
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class TransportConfig:
+
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        connect_timeout: float = 10,
+        read_timeout: float = K.timeout,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 30,
+        retry_after_max: float = 120,
+        retry_statuses=(429, 500, 502, 503, 504),
+        non_idempotent_retry_statuses=(429, 503),
+    ):
+        '''
+        HTTP transport settings for `VoiceAI`.
+
+        Parameters
+        ----------
+        pool_connections: int
+            Number of per-host connection pools to cache.
+        pool_maxsize: int
+            Maximum number of pooled connections per host.
+        pool_block: bool
+            Whether to block when the pool is exhausted instead of opening
+            throwaway connections.
+        keep_alive: bool
+            Reuse connections between requests.
+        connect_timeout: float
+            Seconds to wait for a connection to be established.
+        read_timeout: float
+            Seconds to wait between bytes from the server.
+        max_retries: int
+            Maximum number of retries of a failed request. 0 disables retries.
+        backoff_factor: float
+            Retry n sleeps a random duration up to `backoff_factor * 2**n` seconds.
+        backoff_max: float
+            Upper limit of the backoff sleep.
+        retry_after_max: float
+            Upper limit on how long a `Retry-After` header is honored.
+        retry_statuses: tuple of int
+            Statuses retried for idempotent methods (GET, PUT, DELETE, ...).
+        non_idempotent_retry_statuses: tuple of int
+            Statuses retried for POST and PATCH. Only statuses that mean the
+            request was rejected without being processed belong here, so that
+            retrying cannot create duplicate jobs.
+        '''
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.non_idempotent_retry_statuses = frozenset(non_idempotent_retry_statuses)
+
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+    def make_adapter(self, pool_maxsize=None):
+        if pool_maxsize is None:
+            pool_maxsize = self.pool_maxsize
+        return requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=self.pool_block,
+        )
+
+
+    def should_retry_status(self, method, status):
+        if method.upper() in IDEMPOTENT_METHODS:
+            return status in self.retry_statuses
+        return status in self.non_idempotent_retry_statuses
+
+
+    def should_retry_error(self, method, connect_failed):
+        '''
+        A request that never reached the server can always be retried,
+        anything else only when the method is idempotent.
+        '''
+        return connect_failed or method.upper() in IDEMPOTENT_METHODS
+
+
+    def backoff(self, attempt, retry_after=None):
+        '''
+        Seconds to sleep before retry number `attempt` (starting at 0).\n
+        Honors `Retry-After` when given, otherwise uses full-jitter
+        exponential backoff so that throttled clients spread out.
+        '''
+        if retry_after is not None:
+            return min(retry_after, self.retry_after_max)
+        cap = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, cap)
+
+
+def parse_retry_after(value):
+    '''
+    Seconds to wait according to a `Retry-After` header, which is either
+    a number of seconds or an HTTP date. None if absent or invalid.
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def send(sess, config, method, url, on_retry=None, limit=None, **kwargs):
+    '''
+    `sess.request` with the timeouts, keep-alive and retry policy of `config`.\n
+    Returns the last response once it succeeds or retries run out, so
+    callers see the same errors as without retries.
+    `on_retry(attempt, reason)` is called before every retry, with the
+    status code or exception that caused it. `limit()` returns a context
+    manager entered around every attempt, e.g. `Governor.limit`, so that
+    retries are rate limited too and backoff sleeps hold no slot.
+    '''
+    kwargs.setdefault('timeout', config.timeout)
+    if not config.keep_alive:
+        kwargs['headers'] = dict(kwargs.get('headers') or {}, Connection='close')
+    body = kwargs.get('data')
+    # streamed bodies can only be resent when they can be rewound
+    rewindable = body is None or isinstance(body, (dict, bytes, str)) or getattr(body, 'rewindable', False)
+
+    attempt = 0
+    while True:
+        try:
+            if limit is None:
+                r = sess.request(method, url, **kwargs)
+            else:
+                with limit():
+                    r = sess.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            connect_failed = isinstance(e, requests.exceptions.ConnectTimeout) or \
+                (isinstance(e, requests.exceptions.ConnectionError) and _is_connect_error(e))
+            if attempt >= config.max_retries or not rewindable or \
+                    not config.should_retry_error(method, connect_failed):
+                raise
+            retry_after = None
+            reason = e
+        else:
+            if attempt >= config.max_retries or not rewindable or \
+                    not config.should_retry_status(method, r.status_code):
+                return r
+            retry_after = parse_retry_after(r.headers.get('Retry-After'))
+            reason = r.status_code
+            r.close()
+        if on_retry is not None:
+            on_retry(attempt + 1, reason)
+        time.sleep(config.backoff(attempt, retry_after))
+        attempt += 1
+        if getattr(body, 'rewindable', False):
+            body.rewind()
+
+
+def _is_connect_error(e):
+    reason = e.args[0] if e.args else None
+    reason = getattr(reason, 'reason', reason)
+    name = type(reason).__name__
+    return name in ('NewConnectionError', 'ConnectTimeoutError', 'NameResolutionError')
@@ -0,0 +1,119 @@
+import time
+from pathlib import Path
+
+
+CHUNK_SIZE = 16 * 1024
+
+
+class SynthesisStream:
+
+
+    def __init__(self, source, started: float, chunk_size: int = CHUNK_SIZE):
+        '''
+        Audio of a `VoiceAI.synthesize_stream()` request, read from the
+        network chunk by chunk as it arrives.
+        ```
+        with vai.synthesize_stream(data) as audio:
+            for chunk in audio:
+                player.write(chunk)
+        print(audio.ttfb)
+        ```
+
+        Parameters
+        ----------
+        source: requests.Response, buffer or iterable
+            Response opened with `stream=True`, audio already at hand, e.g. a
+            `TTSCache` hit, which is yielded in slices without copying, or
+            chunks still arriving for another caller, see `TTSCache.stream`.
+        started: float
+            `time.monotonic()` when the request was sent, for `ttfb`.
+        chunk_size: int
+            Largest chunk yielded, in bytes. Chunks of a chunked response are
+            yielded as soon as they arrive, so they can be smaller.
+        '''
+        self._source = source
+        self._started = started
+        self.chunk_size = chunk_size
+        headers = getattr(source, 'headers', None)
+        self.content_type = headers.get('Content-Type') if headers is not None else None
+        self.ttfb = None
+        self.elapsed = None
+        self.bytes_received = 0
+        self._consumed = False
+
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError('SynthesisStream can only be read once')
+        self._consumed = True
+        try:
+            for chunk in self._chunks():
+                if not chunk:
+                    continue
+                if self.ttfb is None:
+                    self.ttfb = time.monotonic() - self._started
+                self.bytes_received += len(chunk)
+                yield chunk
+            self.elapsed = time.monotonic() - self._started
+        finally:
+            self.close()
+
+
+    def _chunks(self):
+        if hasattr(self._source, 'iter_content'):
+            # chunked responses are yielded per HTTP chunk, without waiting for a full chunk_size
+            return self._source.iter_content(self.chunk_size)
+        n = self.chunk_size
+        try:
+            view = memoryview(self._source)
+        except TypeError:
+            return (c[i:i + n] for c in map(memoryview, self._source) for i in range(0, len(c), n))
+        return (view[i:i + n] for i in range(0, len(view), n))
+
+
+    def write_to(self, sink) -> int:
+        '''
+        Write all audio to `sink` as it arrives, without holding it in memory.
+
+        Parameters
+        ----------
+        sink: str, Path, binary file object, or socket
+            Paths are opened for writing, sockets are written with `sendall`.
+
+        Returns
+        -------
+        bytes_written: int
+        '''
+        if isinstance(sink, (str, Path)):
+            with open(sink, 'wb') as fp:
+                return self.write_to(fp)
+        write = sink.sendall if hasattr(sink, 'sendall') else sink.write
+        for chunk in self:
+            write(chunk)
+        return self.bytes_received
+
+
+    def close(self):
+        close = getattr(self._source, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except BufferError:
+                # chunks of an mmap are still in use, it is closed once they are gone
+                pass
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __del__(self):
+        # an abandoned stream gives its connection back to the pool
+        try:
+            self.close()
+        except Exception:
+            pass
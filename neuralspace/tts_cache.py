@@ -0,0 +1,416 @@
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from neuralspace import constants as K
+from neuralspace.tts import CHUNK_SIZE
+from neuralspace.dedup import canonical_config
+
+
+MiB = 1024 * 1024
+
+
+class TTSCache:
+
+
+    def __init__(self, memory_bytes: int = 64 * MiB, disk_bytes: int = 1024 * MiB, path=None):
+        '''
+        Content-addressed cache of synthesized audio for `VoiceAI.synthesize`
+        and `synthesize_stream`, for prompts that are synthesized over and over.\n
+        Audio is keyed by a hash of the canonicalized TTS payload (text, voice
+        and parameters). Recently used audio is kept in memory, and all audio
+        on disk under `NS_HOME`, each tier within its own byte budget with the
+        least recently used audio evicted first. Disk hits are read through
+        `mmap`, and concurrent requests for the same missing prompt share one
+        request to the server.
+
+        Parameters
+        ----------
+        memory_bytes: int
+            Byte budget of the in-memory tier. 0 disables it.
+        disk_bytes: int
+            Byte budget of the on-disk tier. 0 disables it.
+        path: str or Path, optional
+            Directory of the on-disk tier. Defaults to `NS_HOME/tts`.
+        '''
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.path = str(path) if path is not None else str(K.NS_HOME / 'tts')
+        self.hits = 0
+        self.misses = 0
+        self._namespace = ''
+        self._lock = threading.Lock()
+        # key -> bytes, least recently used first
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        # key -> size of the file on disk, least recently used first
+        self._disk = None
+        self._disk_used = 0
+        # key -> _Fill, for prompts being synthesized
+        self._in_flight = {}
+
+
+    def bind(self, namespace):
+        '''
+        Select the account the audio belongs to, so that different API keys
+        or base URLs never share entries.
+        '''
+        self._namespace = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+
+
+    def key(self, data) -> str:
+        '''
+        Cache key of a TTS payload. `stream` does not change the audio, so it is ignored.
+        '''
+        payload = {k: v for k, v in data.items() if k != 'stream'}
+        h = hashlib.sha256()
+        h.update(self._namespace.encode())
+        h.update(canonical_config(payload).encode())
+        return h.hexdigest()
+
+
+    def get(self, key):
+        '''
+        Cached audio of `key`, or None.\n
+        Returns `bytes` from the memory tier, or a read-only `mmap` of the
+        file from the disk tier; close it once done.
+        '''
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+            self._load_disk()
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+        try:
+            with open(self._file(key), 'rb') as fp:
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # evicted by another process, or empty
+            with self._lock:
+                self._drop_disk(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return mm
+
+
+    def put(self, key, audio):
+        '''
+        Store audio in both tiers.
+        '''
+        with self.writer(key) as w:
+            w.write(bytes(audio))
+
+
+    def writer(self, key):
+        '''
+        File object that adds the audio written to it to the cache once
+        closed, e.g. while the audio is being streamed to a caller.
+        Call `abort()` on it to discard incomplete audio.
+        '''
+        return _DiskWriter(self, key)
+
+
+    def stream(self, key, open_source):
+        '''
+        Cached audio of `key`, or audio being synthesized, readable while it arrives.\n
+        On a miss, `open_source()` is called to make the request and returns
+        the response, opened with `stream=True` and its status checked. A
+        background thread reads it into the cache, and the audio is returned
+        as an iterable of chunks that yields them as they arrive. Callers
+        asking for the same key meanwhile get the same iterable instead of
+        making their own request, so none of them waits for another to read
+        its audio, and abandoning one reader leaves the others unaffected.\n
+        Returns audio as from `get` on a hit.
+        '''
+        audio = self.get(key)
+        if audio is not None:
+            return audio
+        fill, owner = self._join(key)
+        if not owner:
+            return fill
+        try:
+            r = open_source()
+        except BaseException as e:
+            self._leave(key, fill, e)
+            raise
+        fill.headers = getattr(r, 'headers', None)
+        threading.Thread(target=self._read, args=(key, fill, r), name='ns-tts-cache', daemon=True).start()
+        return fill
+
+
+    def fetch(self, key, func, *args, **kwargs) -> bytes:
+        '''
+        Cached audio of `key`, calling `func(*args, **kwargs)` on a miss.\n
+        Threads asking for the same missing key wait for the first one's
+        request instead of making their own, and get its error if it fails.
+        '''
+        audio = self.get(key)
+        if audio is not None:
+            if isinstance(audio, mmap.mmap):
+                audio = _to_bytes(audio)
+                self._put_memory(key, audio)
+            return audio
+        fill, owner = self._join(key)
+        if not owner:
+            return b''.join(fill)
+        try:
+            audio = func(*args, **kwargs)
+            self.put(key, audio)
+        except BaseException as e:
+            self._leave(key, fill, e)
+            raise
+        fill.append(audio)
+        self._leave(key, fill)
+        return audio
+
+
+    def clear(self):
+        '''
+        Drop all audio from both tiers.
+        '''
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            self._load_disk()
+            for key in list(self._disk):
+                self._drop_disk(key)
+
+
+    def __len__(self):
+        with self._lock:
+            self._load_disk()
+            return len(self._disk.keys() | self._memory.keys())
+
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], f'{key}.audio')
+
+
+    def _put_memory(self, key, audio):
+        if len(audio) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = audio
+            self._memory_used += len(audio)
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+
+
+    def _add_disk(self, key, tmp, size):
+        '''
+        Move a finished temporary file into the disk tier and evict down to the budget.
+        '''
+        with self._lock:
+            self._load_disk()
+            if size > self.disk_bytes:
+                os.remove(tmp)
+                return
+            os.replace(tmp, self._file(key))
+            self._disk_used += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            while self._disk_used > self.disk_bytes:
+                self._drop_disk(next(iter(self._disk)))
+
+
+    def _drop_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_used -= size
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+
+    def _load_disk(self):
+        '''
+        Index the files already on disk, oldest access first. Called with the lock held.
+        '''
+        if self._disk is not None:
+            return
+        entries = []
+        if os.path.isdir(self.path):
+            for sub in os.scandir(self.path):
+                if not sub.is_dir():
+                    continue
+                for f in os.scandir(sub.path):
+                    if f.name.endswith('.audio'):
+                        st = f.stat()
+                        entries.append((st.st_atime, f.name[:-len('.audio')], st.st_size))
+        entries.sort()
+        self._disk = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_used = sum(self._disk.values())
+
+
+    def _join(self, key):
+        '''
+        The `_Fill` of `key`, and whether the caller registered it and must
+        make the request, or joins a request already in flight.
+        '''
+        with self._lock:
+            fill = self._in_flight.get(key)
+            if fill is not None:
+                self.misses -= 1
+                self.hits += 1
+                return fill, False
+            fill = self._in_flight[key] = _Fill()
+            return fill, True
+
+
+    def _leave(self, key, fill, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        fill.finish(error)
+
+
+    def _read(self, key, fill, r):
+        '''
+        Read a streamed response into the cache and `fill`, on a background thread.
+        '''
+        error = None
+        try:
+            with self.writer(key) as w:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    if chunk:
+                        w.write(chunk)
+                        fill.append(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            r.close()
+            self._leave(key, fill, error)
+
+
+class _DiskWriter:
+
+
+    def __init__(self, cache, key):
+        self._cache = cache
+        self._key = key
+        self._fp = None
+        self._tmp = None
+        # audio small enough for the memory tier, kept until closed
+        self._chunks = [] if cache.memory_bytes > 0 else None
+        self.size = 0
+        if cache.disk_bytes > 0:
+            os.makedirs(os.path.dirname(cache._file(key)), exist_ok=True)
+            self._tmp = f'{cache._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            self._fp = open(self._tmp, 'wb')
+
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self._chunks is not None:
+            if self.size <= self._cache.memory_bytes:
+                self._chunks.append(bytes(chunk))
+            else:
+                self._chunks = None
+        if self._fp is not None:
+            self._fp.write(chunk)
+            if self.size > self._cache.disk_bytes:
+                self._drop_file()
+
+
+    def abort(self):
+        self._chunks = None
+        self._drop_file()
+
+
+    def close(self):
+        if self._chunks is not None and self.size > 0:
+            audio = b''.join(self._chunks)
+            self._cache._put_memory(self._key, audio)
+        self._chunks = None
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+            if self.size == 0:
+                os.remove(self._tmp)
+            else:
+                self._cache._add_disk(self._key, self._tmp, self.size)
+
+
+    def _drop_file(self):
+        if self._fp is None:
+            return
+        self._fp.close()
+        self._fp = None
+        os.remove(self._tmp)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class _Fill:
+
+
+    def __init__(self):
+        '''
+        Chunks of audio being synthesized, iterated by any number of readers
+        while they arrive. Each reader waits at most `constants.timeout`
+        seconds for the next chunk.
+        '''
+        self.headers = None
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self._cond = threading.Condition()
+
+
+    def append(self, chunk):
+        with self._cond:
+            self._chunks.append(bytes(chunk))
+            self._cond.notify_all()
+
+
+    def finish(self, error=None):
+        with self._cond:
+            self._done = True
+            self._error = error
+            self._cond.notify_all()
+
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: i < len(self._chunks) or self._done, K.timeout):
+                    raise TimeoutError(f'No audio received for {K.timeout}s')
+                if i < len(self._chunks):
+                    chunk = self._chunks[i]
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            i += 1
+            yield chunk
+
+
+def _to_bytes(audio):
+    if isinstance(audio, mmap.mmap):
+        try:
+            return audio[:]
+        finally:
+            audio.close()
+    return audio
@@ -1,11 +1,12 @@
 import os
 import io
+import json
 import asyncio
 from uuid import uuid4
 from pathlib import Path
 from functools import partial
 
-from neuralspace import constants as K
+from neuralspace import env, constants as K
 
 
 async def run_sync_as_async(executor, func, *args, **kwargs):
@@ -22,16 +23,30 @@ def run_async_as_sync(func, *args, **kwargs):
     return res
 
 
-def get_filename(file):
-    if not file:
+def is_buffer(obj):
+    try:
+        memoryview(obj)
+    except TypeError:
+        return False
+    return True
+
+
+def _check_given(file):
+    if file is None or (isinstance(file, (str, bytes)) and not file):
+        raise ValueError('No file given')
+    if is_buffer(file) and memoryview(file).nbytes == 0:
         raise ValueError('No file given')
+
+
+def get_filename(file):
+    _check_given(file)
     if isinstance(file, (str, Path)):
         if not os.path.exists(file):
             raise ValueError(f'No such file: {file}')
         elif os.path.splitext(file)[1][1:] not in K.FILE_EXTS:
             raise ValueError(f'Unsupported file type: {file}')
         name = os.path.basename(file)
-    elif isinstance(file, (bytes, io.IOBase)):
+    elif isinstance(file, io.IOBase) or is_buffer(file):
         name = uuid4().hex + '.wav'
     else:
         raise TypeError(f'Unsupported file type: {type(file)}')
@@ -39,13 +54,12 @@ def get_filename(file):
 
 
 def get_content(file):
-    if not file:
-        raise ValueError('No file given')
+    _check_given(file)
     if isinstance(file, (str, Path)):
         if not os.path.exists(file):
             raise ValueError(f'No such file: {file}')
         content = open(file, 'rb')
-    elif isinstance(file, (bytes, io.IOBase)):
+    elif isinstance(file, io.IOBase) or is_buffer(file):
         content = file
     else:
         raise TypeError(f'Unsupported file type: {type(file)}')
@@ -63,8 +77,173 @@ def create_formdata_file(file):
     return data
 
 
+def create_formdata_stream(file, name=None):
+    '''
+    Like `create_formdata_file`, but leaves paths unopened so that
+    `multipart.MultipartEncoder` can stream them in chunks.
+    '''
+    if name is None:
+        name = get_filename(file)
+    if isinstance(file, (str, Path)):
+        content = file
+    else:
+        content = get_content(file)
+    data = (
+        name,
+        content,
+        'application/octet-stream',
+    )
+    return data
+
+
 def get_json_resp(r):
     if r.status_code == 200 and \
             r.headers.get('Content-type', '').startswith('application/json'):
         return r.json()
     raise ValueError(f'{r.status_code}: {r.text}')
+
+
+def resolve_api_key(api_key=None):
+    key = None
+    if api_key is not None:
+        key = api_key
+    elif env.API_KEY is not None:
+        key = env.API_KEY
+    elif os.path.exists(K.API_KEY_PATH):
+        with open(K.API_KEY_PATH) as fp:
+            text = fp.read().strip()
+            if text:
+                key = text
+
+    if not key:
+        raise ValueError(
+            'Either provide api_key parameter, or set environment variable `NS_API_KEY`'
+        )
+    return key
+
+
+def create_headers(api_key):
+    hdrs = {
+        'Authorization': api_key,
+    }
+    return hdrs
+
+
+def resolve_config(config):
+    cfg = {}
+    if isinstance(config, (str, Path)):
+        if os.path.exists(config):
+            with open(config) as fp:
+                cfg = json.load(fp)
+        else:
+            try:
+                cfg = json.loads(config)
+            except:
+                raise ValueError(f'Could not parse provided JSON config: {config}')
+    elif isinstance(config, io.IOBase):
+        cfg = json.load(config)
+    else:
+        cfg = config
+
+    if not isinstance(cfg, dict):
+        raise ValueError(f'Invalid type for config: {type(cfg)}')
+    return cfg
+
+
+def is_completed(result):
+    return result.get(K.k_data) is not None and \
+        result[K.k_data].get(K.k_status, '').lower() == K.k_completed
+
+
+def is_failed(result):
+    return result.get(K.k_data) is not None and \
+        'fail' in str(result[K.k_data].get(K.k_status, '')).lower()
+
+
+def iter_poll_schedule(poll_schedule=None):
+    '''
+    Yields sleep durations from the schedule, repeating the last one forever.
+    '''
+    if not poll_schedule:
+        poll_schedule = K.poll_schedule
+    yield from poll_schedule
+    while True:
+        yield poll_schedule[-1]
+
+
+def percentiles(values, ps=(50, 90, 95, 99)):
+    '''
+    Linearly interpolated percentiles of `values`, e.g. `{'p50': ..., 'p99': ...}`.\n
+    Empty when there are no values.
+    '''
+    vals = sorted(values)
+    res = {}
+    if not vals:
+        return res
+    for p in ps:
+        k = (len(vals) - 1) * p / 100
+        lo = int(k)
+        hi = min(lo + 1, len(vals) - 1)
+        res[f'p{p}'] = vals[lo] + (vals[hi] - vals[lo]) * (k - lo)
+    return res
+
+
+def endpoint_class(method, url):
+    '''
+    Class of an API request for rate limiting: `upload`, `poll`, `tts`,
+    `catalog` or `other`. See `ratelimit.Governor`.
+    '''
+    if K.FULL_JOBS_BATCH_URL is not None and url.startswith(K.FULL_JOBS_BATCH_URL):
+        return 'poll'
+    if url.startswith(K.FULL_JOBS_URL):
+        return 'upload' if method == 'POST' else 'poll'
+    # checked before tts, voices live under the tts url
+    if url.startswith(K.FULL_VOICES_URL) or url.startswith(K.FULL_LANGS_URL):
+        return 'catalog'
+    if url.startswith(K.FULL_TTS_URL):
+        return 'tts'
+    if url.startswith(K.FULL_VOCAB_ADAPT_URL) and method == 'GET':
+        return 'catalog'
+    return 'other'
+
+
+# url building, shared by the sync and async clients
+
+def job_url(job_id):
+    return f'{K.FULL_JOBS_URL.rstrip("/")}/{job_id}'
+
+
+def langs_url(type):
+    return f'{K.FULL_LANGS_URL}?type={type}'
+
+
+def token_url(duration):
+    return f'{K.FULL_TOKEN_URL}?duration={duration}'
+
+
+def tts_job_url(job_id=None):
+    url = K.FULL_TTS_URL.rstrip('/')
+    if job_id is not None:
+        url = f'{url}/{job_id}'
+    return url
+
+
+def dict_url(dict_id=None):
+    url = K.FULL_VOCAB_ADAPT_URL
+    if dict_id is not None:
+        url = f'{url}/{dict_id}'
+    return url
+
+
+def stream_url(
+    language_id,
+    token,
+    min_chunk_size=1,
+    max_chunk_size=5,
+    vad_threshold=0.5,
+    vad_min_silence=0.1,
+    disable_partial=False,
+    audio_format='pcm_16k',
+    noise_level=0.0,
+):
+    return f'{K.FULL_STREAM_URL}/{language_id}/{token}/{uuid4()}?min_chunk_size={min_chunk_size}&max_chunk_size={max_chunk_size}&vad_threshold={vad_threshold}&vad_min_silence={vad_min_silence}&disable_partial={disable_partial}&format={audio_format}&noise_level={noise_level}'
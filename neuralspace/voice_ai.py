@@ -1,55 +1,202 @@
 import io
-import os
 import json
 import time
-import threading
-from uuid import uuid4
 from pathlib import Path
-from contextlib import contextmanager
-from typing import Any, List, Dict, Union, Optional, Callable
+from contextlib import contextmanager, nullcontext
+from typing import Any, List, Dict, Union, Optional, Callable, Iterable, Iterator
 
 import requests
 import websocket
 
-from neuralspace import env, utils, constants as K
+from neuralspace import bulk, dict_sync, transport, utils, constants as K
+from neuralspace.watcher import JobWatcher
+from neuralspace.multipart import MultipartEncoder, UploadProgress
+from neuralspace.transport import TransportConfig
+from neuralspace.cache import CatalogCache
+from neuralspace.tokens import TokenManager
+from neuralspace.stream_pool import StreamPool
+from neuralspace.silence import SilenceTrimmer, OffsetMap
+from neuralspace.dedup import Deduplicator
+from neuralspace.job_store import JobStore
+from neuralspace.tts import SynthesisStream, CHUNK_SIZE as TTS_CHUNK_SIZE
+from neuralspace.tts_cache import TTSCache
+from neuralspace.ratelimit import RateLimiter, Governor
+from neuralspace.metrics import Instrumentation
 
 
 class VoiceAI:
 
 
-    def __init__(self, api_key=None):
+    def __init__(
+        self,
+        api_key=None,
+        transport: Optional[TransportConfig] = None,
+        cache: Optional[CatalogCache] = None,
+        tokens: Optional[TokenManager] = None,
+        stream_pool: Optional[StreamPool] = None,
+        dedup: Optional[Deduplicator] = None,
+        job_store: Optional[JobStore] = None,
+        tts_cache: Optional[TTSCache] = None,
+        governor: Optional[Governor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
         '''
         VoiceAI instance to make transcription requests
+
+        Parameters
+        ----------
+        api_key: str, optional
+            Falls back to the `NS_API_KEY` environment variable, then to the saved CLI login.
+        transport: TransportConfig, optional
+            Connection pool, timeout and retry settings. See `TransportConfig`.
+        cache: CatalogCache, optional
+            Cache for `languages`, `voices`, `get_custom_dicts` and `get_custom_dict`.
+            Not cached by default.
+        tokens: TokenManager, optional
+            Keeps streaming tokens ready ahead of `stream()`, so that opening a
+            stream does not wait for a token request first.
+        stream_pool: StreamPool, optional
+            Keeps streaming connections open and ready, so that `stream()`
+            returns without any connection setup.
+        dedup: Deduplicator, optional
+            Skip uploading files that were already submitted with the same
+            config, and reuse the earlier job instead.
+        job_store: JobStore, optional
+            Durable record of submitted jobs and their results, so that
+            polling can be picked up again after a restart with `resume_jobs()`.
+        tts_cache: TTSCache, optional
+            Cache of synthesized audio, so repeated prompts of `synthesize`
+            (with `stream` set) and `synthesize_stream` skip the server.
+        governor: Governor, optional
+            Rate and concurrency limits per endpoint class, which can be shared
+            with other clients and processes to stay within one quota.
+        instrumentation: Instrumentation, optional
+            Request hooks and metrics: latencies, bytes, retries, job
+            completion times and streaming latencies.
         '''
-        self._api_key = None
+        self._api_key = utils.resolve_api_key(api_key)
+        self._transport = transport if transport is not None else TransportConfig()
         self._session = None
-
-        if api_key is not None:
-            self._api_key = api_key
-        elif env.API_KEY is not None:
-            self._api_key = env.API_KEY
-        elif os.path.exists(K.API_KEY_PATH):
-            with open(K.API_KEY_PATH) as fp:
-                text = fp.read().strip()
-                if text:
-                    self._api_key = text
-
-        if not self._api_key:
-            raise ValueError(
-                'Either provide api_key parameter, or set environment variable `NS_API_KEY`'
-            )
+        self._governor = governor
+        self._metrics = instrumentation
+        self._watcher = None
+        # job id -> OffsetMap of jobs uploaded with trimmed silence
+        self._offset_maps = {}
+        self._cache = cache
+        if cache is not None:
+            cache.bind(f'{K.BASE_URL}|{self._api_key}')
+        self._tokens = tokens
+        if tokens is not None:
+            tokens.bind(self._get_short_lived_token)
+        self._stream_pool = stream_pool
+        if stream_pool is not None:
+            stream_pool.bind(self._connect_stream)
+        self._dedup = dedup
+        if dedup is not None:
+            dedup.bind(f'{K.BASE_URL}|{self._api_key}')
+        self._job_store = job_store
+        if job_store is not None:
+            job_store.bind(f'{K.BASE_URL}|{self._api_key}')
+        # cleared when the server turns out not to have the batch status endpoint
+        self._batch_status = K.FULL_JOBS_BATCH_URL is not None
+        self._tts_cache = tts_cache
+        if tts_cache is not None:
+            tts_cache.bind(f'{K.BASE_URL}|{self._api_key}')
+        self._dict_state = dict_sync.SyncState(f'{K.BASE_URL}|{self._api_key}')
 
 
     def _get_session(self):
         if self._session is None:
             self._session = requests.Session()
+            adapter = self._transport.make_adapter()
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
         return self._session
 
 
+    def _request(self, method, url, **kwargs):
+        metrics = self._metrics
+        if self._governor is None and metrics is None:
+            return transport.send(self._get_session(), self._transport, method, url, **kwargs)
+        endpoint = utils.endpoint_class(method, url)
+        governor = self._governor
+        limit = (lambda: governor.limit(endpoint)) if governor is not None else None
+        if metrics is None:
+            return transport.send(self._get_session(), self._transport, method, url, limit=limit, **kwargs)
+
+        info = metrics.request_started(method, url, endpoint)
+        retries = []
+        queued = []
+
+        @contextmanager
+        def timed_limit():
+            # time spent waiting for the governor before the first attempt
+            with limit() if limit is not None else nullcontext():
+                if not queued:
+                    queued.append(time.monotonic() - info.started)
+                yield
+
+        def on_retry(attempt, reason):
+            retries.append(attempt)
+            metrics.retry(method, url, endpoint, attempt, reason)
+
+        try:
+            r = transport.send(
+                self._get_session(), self._transport, method, url, on_retry=on_retry, limit=timed_limit, **kwargs
+            )
+        except Exception as e:
+            metrics.request_finished(info, queued=queued[0] if queued else 0.0, error=e, retries=len(retries))
+            raise
+        metrics.request_finished(info, queued=queued[0], response=r, retries=len(retries), stream=kwargs.get('stream', False))
+        return r
+
+
+    def _get_catalog(self, key, url):
+        def fetch():
+            r = self._request('GET', url, headers=self._create_headers())
+            return utils.get_json_resp(r)
+
+        if self._cache is None:
+            return fetch()
+        return self._cache.fetch(key, fetch)
+
+
+    def _get_watcher(self):
+        if self._watcher is None:
+            self._watcher = JobWatcher(self)
+        return self._watcher
+
+
+    def _ensure_pool_size(self, size):
+        '''
+        Grow the session's per-host connection pool to at least `size`,
+        so that `size` threads can share it without discarding connections.
+        '''
+        sess = self._get_session()
+        adapter = sess.get_adapter(K.BASE_URL)
+        if getattr(adapter, '_pool_maxsize', 0) >= size:
+            return
+        adapter = self._transport.make_adapter(pool_maxsize=size)
+        sess.mount('https://', adapter)
+        sess.mount('http://', adapter)
+
+
     def close(self):
         '''
-        Close the underlying HTTP session.
+        Close the underlying HTTP session, stop watching jobs, and stop
+        prefetching stream tokens and connections.
         '''
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        if self._stream_pool is not None:
+            self._stream_pool.close()
+        if self._tokens is not None:
+            self._tokens.close()
+        if self._dedup is not None:
+            self._dedup.close()
+        if self._job_store is not None:
+            self._job_store.close()
         try:
             self._session.close()
         except:
@@ -58,19 +205,21 @@ class VoiceAI:
 
     def transcribe(
         self,
-        file: Union[str, Path, bytes, io.BytesIO],
+        file: Union[str, Path, bytes, memoryview, io.BytesIO],
         config: Union[Dict[str, Any], str, Path, io.IOBase],
         on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
         on_complete_kwargs: Optional[Dict[str, Any]] = {},
         poll_schedule: Optional[List[float]] = None,
+        on_upload_progress: Optional[Callable[[UploadProgress], None]] = None,
+        trim_silence: Union[bool, SilenceTrimmer] = False,
     ) -> str:
         '''
         Transcribe an audio file.
 
         Parameters
         ----------
-        file: str, Path, bytes, or io.BytesIO
-            Path to file, or data in bytes, or in-memory BytesIO object.
+        file: str, Path, bytes, memoryview, or io.BytesIO
+            Path to file, or data in bytes or any other buffer, or a binary file object.
         config: dict, str, Path or io.IOBase
             Job config details.\n
             e.g. 
@@ -97,6 +246,8 @@ class VoiceAI:
             ```
         on_complete: callback, optional
             If provided, will be called when the transcription job completes.\n
+            All jobs are polled by one shared `JobWatcher`, and callbacks run on
+            its bounded thread pool.\n
             Example:
             ```
             def callback(result: Dict[str, Any], **kwargs: Dict[str, Any]) -> None:
@@ -108,6 +259,17 @@ class VoiceAI:
             Sequence of sleep times after every poll attempt.\n
             Last one continues to be used when number of attempts exceed len(poll_schedule).\n
             e.g. [1, 1, 1, 5, 5, 10]
+        on_upload_progress: callback, optional
+            Called with an `UploadProgress(bytes_sent, total_bytes, elapsed, bytes_per_second)`
+            for every chunk of the request body sent.\n
+            The file is streamed in chunks, so memory use does not grow with file size.
+        trim_silence: bool or SilenceTrimmer, optional
+            Cut long silences out of WAV files before uploading, to save upload
+            time and billed minutes. Timestamps in the first completed result from
+            `get_job_status` or `poll_until_complete` are shifted back onto the
+            original timeline.\n
+            Pass a `SilenceTrimmer` to tune the detection. Requires numpy.
+            Other file types are uploaded unchanged.
 
         Returns
         -------
@@ -118,24 +280,71 @@ class VoiceAI:
             To wait until the job completes, use `poll_until_complete(job_id)`
         '''
         config = self._resolve_config(config)
-        resp = self._create_transcribe_job(file, config)
-        job_id = resp[K.k_data][K.k_job_id]
+        job_id = self._submit(file, config, on_progress=on_upload_progress, trim_silence=trim_silence)
         if on_complete is not None:
-            if on_complete_kwargs is None:
-                on_complete_kwargs = {}
-            t = threading.Thread(
-                target=self._poll_and_call,
-                args=(job_id,),
-                kwargs={
-                    'on_complete': on_complete,
-                    'on_complete_kwargs': on_complete_kwargs,
-                    'poll_schedule': poll_schedule,
-                },
+            self._get_watcher().watch(
+                job_id,
+                on_complete=on_complete,
+                on_complete_kwargs=on_complete_kwargs,
+                poll_schedule=poll_schedule,
             )
-            t.start()
         return job_id
 
 
+    def transcribe_many(
+        self,
+        files: Iterable[Union[str, Path, bytes, io.BytesIO]],
+        config: Union[Dict[str, Any], str, Path, io.IOBase],
+        max_workers: int = 8,
+        max_in_flight: int = 64,
+        poll_schedule: Optional[List[float]] = None,
+        trim_silence: Union[bool, SilenceTrimmer] = False,
+    ) -> Iterator[bulk.TranscribeResult]:
+        '''
+        Transcribe many audio files with bounded concurrency.\n
+        Results are yielded as each job completes, not in input order.
+        ```
+        for res in vai.transcribe_many(files, config, max_workers=16):
+            if res.error is not None:
+                print(f'{res.file} failed: {res.error}')
+            else:
+                print(res.result['data']['result']['transcription']['transcript'])
+        ```
+
+        Parameters
+        ----------
+        files: iterable of str, Path, bytes, or io.BytesIO
+            Files to transcribe. Consumed lazily, so it can be a generator.
+        config: dict, str, Path or io.IOBase
+            Job config used for every file. See `transcribe`.
+        max_workers: int
+            Number of threads (and pooled connections) used for uploads and polls.
+        max_in_flight: int
+            Maximum number of files being uploaded or waiting for completion at once.
+        poll_schedule: List[float], optional
+            Sleep times between polls of each job. See `transcribe`.
+        trim_silence: bool or SilenceTrimmer, optional
+            Cut long silences out of WAV files before uploading. See `transcribe`.
+
+        Returns
+        -------
+        results: Iterator[TranscribeResult]
+            One `(index, file, job_id, result, error)` tuple per input file.\n
+            Failures are reported through `error` instead of being raised.
+        '''
+        config = self._resolve_config(config)
+        self._ensure_pool_size(max_workers)
+        return bulk.transcribe_many(
+            self,
+            files,
+            config,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            poll_schedule=poll_schedule,
+            trim_silence=trim_silence,
+        )
+
+
     @contextmanager
     def stream(self,
                language_id: str,
@@ -179,10 +388,22 @@ class VoiceAI:
         '''
         if timeout is None:
             timeout = K.timeout
-        token = self._get_short_lived_token(timeout)
-        url = f'{K.FULL_STREAM_URL}/{language_id}/{token}/{uuid4()}?min_chunk_size={min_chunk_size}&max_chunk_size={max_chunk_size}&vad_threshold={vad_threshold}&vad_min_silence={vad_min_silence}&disable_partial={disable_partial}&format={audio_format}&noise_level={noise_level}'
-        ws = websocket.WebSocket()
-        ws.connect(url, timeout=timeout)
+        params = {
+            'language_id': language_id,
+            'min_chunk_size': min_chunk_size,
+            'max_chunk_size': max_chunk_size,
+            'vad_threshold': vad_threshold,
+            'vad_min_silence': vad_min_silence,
+            'disable_partial': disable_partial,
+            'audio_format': audio_format,
+            'noise_level': noise_level,
+            'timeout': timeout,
+        }
+        ws = None
+        if self._stream_pool is not None:
+            ws = self._stream_pool.acquire(params)
+        if ws is None:
+            ws, _ = self._connect_stream(params)
         try:
             yield ws
         finally:
@@ -190,6 +411,20 @@ class VoiceAI:
             ws.shutdown()
 
 
+    def _connect_stream(self, params):
+        params = dict(params)
+        timeout = params.pop('timeout')
+        if self._tokens is not None and self._tokens.duration == timeout:
+            expires_at, token = self._tokens.acquire_entry()
+        else:
+            expires_at = time.monotonic() + timeout
+            token = self._get_short_lived_token(timeout)
+        url = utils.stream_url(token=token, **params)
+        ws = websocket.WebSocket()
+        ws.connect(url, timeout=timeout)
+        return ws, expires_at
+
+
     def languages(self, type: str) -> List[str]:
         '''
         Get supported languages based on transcription type.
@@ -204,11 +439,8 @@ class VoiceAI:
         languages: List[str]
             List of language codes
         '''
-        url = f'{K.FULL_LANGS_URL}?type={type}'
-        hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs)
-        resp = utils.get_json_resp(r)
+        url = utils.langs_url(type)
+        resp = self._get_catalog(('languages', type), url)
         langs = resp[K.k_data][K.k_langs]
         return langs
 
@@ -221,10 +453,7 @@ class VoiceAI:
             List of voices along with metadata
         '''
         url = f'{K.FULL_VOICES_URL}'
-        hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs)
-        resp = utils.get_json_resp(r)
+        resp = self._get_catalog(('voices',), url)
         voices = resp[K.k_data]
         return voices
 
@@ -243,11 +472,104 @@ class VoiceAI:
         result: dict
             The current status of the job.
         '''
-        url = f'{K.FULL_JOBS_URL.rstrip("/")}/{job_id}'
+        url = utils.job_url(job_id)
         hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs)
+        r = self._request('GET', url, headers=hdrs)
         resp = utils.get_json_resp(r)
+        return self._on_job_status(job_id, resp)
+
+
+    def get_job_statuses(self, job_ids: Iterable[str], max_workers: int = 16) -> Dict[str, Any]:
+        '''
+        Get the status of many transcription jobs concurrently.
+
+        Parameters
+        ----------
+        job_ids: iterable of str
+            The ids of the transcription jobs.
+        max_workers: int
+            Number of concurrent requests (and pooled connections).
+
+        Returns
+        -------
+        results: dict
+            Job id to its status, as returned by `get_job_status`, or to the
+            exception raised for that job.
+        '''
+        return {
+            job_id: result if error is None else error
+            for job_id, result, error in self.iter_job_statuses(job_ids, max_workers=max_workers)
+        }
+
+
+    def iter_job_statuses(self, job_ids: Iterable[str], max_workers: int = 16) -> Iterator[tuple]:
+        '''
+        Like `get_job_statuses`, but yields `(job_id, result, error)` as each
+        status arrives, so results can be used before the slowest one is in.\n
+        When a batch status endpoint is configured (`NS_JOBS_BATCH_URL`), up
+        to `JOBS_BATCH_SIZE` jobs are fetched per request instead.
+        '''
+        self._ensure_pool_size(max_workers)
+        if not self._batch_status:
+            yield from bulk.fan_out(self.get_job_status, job_ids, max_workers=max_workers)
+            return
+        batches = _chunked(job_ids, K.JOBS_BATCH_SIZE)
+        for batch, results, error in bulk.fan_out(self._get_job_status_batch, batches, max_workers=max_workers):
+            for job_id in batch:
+                if error is not None:
+                    yield job_id, None, error
+                elif isinstance(results[job_id], Exception):
+                    yield job_id, None, results[job_id]
+                else:
+                    yield job_id, results[job_id], None
+
+
+    def _get_job_status_batch(self, job_ids):
+        '''
+        Statuses of up to `JOBS_BATCH_SIZE` jobs in one request, falling back
+        to one request per job if the server has no batch endpoint.
+        '''
+        results = {}
+        if self._batch_status:
+            hdrs = self._create_headers()
+            r = self._request('POST', K.FULL_JOBS_BATCH_URL, headers=hdrs, json={K.k_job_ids: list(job_ids)})
+            if r.status_code in (404, 405, 501):
+                self._batch_status = False
+            else:
+                resp = utils.get_json_resp(r)
+                envelope = {k: v for k, v in resp.items() if k != K.k_data}
+                for data in resp[K.k_data]:
+                    job_id = data[K.k_job_id]
+                    results[job_id] = self._on_job_status(job_id, dict(envelope, data=data))
+        for job_id in job_ids:
+            if job_id in results:
+                continue
+            try:
+                results[job_id] = self.get_job_status(job_id)
+            except Exception as e:
+                results[job_id] = e
+        return results
+
+
+    def _on_job_status(self, job_id, resp):
+        '''
+        Shift timestamps of trimmed uploads and record finished jobs in the job store.
+        '''
+        if utils.is_completed(resp) or utils.is_failed(resp):
+            # a job finishes once, so its offsets are not needed again
+            offsets = self._offset_maps.pop(job_id, None)
+            if offsets is not None and utils.is_completed(resp):
+                offsets.apply(resp[K.k_data].get('result'))
+        if self._metrics is not None:
+            if utils.is_completed(resp):
+                self._metrics.job_completed(job_id)
+            elif utils.is_failed(resp):
+                self._metrics.job_failed(job_id)
+        if self._job_store is not None:
+            if utils.is_completed(resp):
+                self._job_store.finish(job_id, resp)
+            elif utils.is_failed(resp):
+                self._job_store.finish(job_id, resp, failed=True)
         return resp
 
 
@@ -255,22 +577,57 @@ class VoiceAI:
         '''
         Poll the status and wait till the job completes.
         '''
-        if not poll_schedule:
-            poll_schedule = K.poll_schedule
-        i = 0
         result = None
-        while True:
+        for dur in utils.iter_poll_schedule(poll_schedule):
             result = self.get_job_status(job_id)
-            if result.get(K.k_data) is not None and \
-                    result[K.k_data].get(K.k_status, '').lower() == K.k_completed:
+            if utils.is_completed(result):
                 break
-            dur = poll_schedule[i]
-            if i < len(K.poll_schedule) - 1:
-                i += 1
             time.sleep(dur)
         return result
 
 
+    def resume_jobs(
+        self,
+        on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+        on_complete_kwargs: Optional[Dict[str, Any]] = {},
+        poll_schedule: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        '''
+        Resume polling every job left pending in the `JobStore`, e.g. after a restart.
+        ```
+        vai = VoiceAI(job_store=JobStore())
+        futures = vai.resume_jobs(on_complete=callback)
+        ```
+
+        Parameters
+        ----------
+        on_complete: callback, optional
+            Called with the result of each job as it completes. See `transcribe`.
+        on_complete_kwargs: dict, optional
+            Passed as **kwargs to on_complete, along with result.
+        poll_schedule: List[float], optional
+            Sleep times between polls of each job. See `transcribe`.
+
+        Returns
+        -------
+        futures: Dict[str, concurrent.futures.Future]
+            Job id to a future of its completed status.
+        '''
+        if self._job_store is None:
+            raise ValueError('resume_jobs() needs a VoiceAI created with a job_store')
+        futures = {}
+        for rec in self._job_store.unfinished():
+            if rec.offsets is not None:
+                self._offset_maps[rec.job_id] = OffsetMap(rec.offsets)
+            futures[rec.job_id] = self._get_watcher().watch(
+                rec.job_id,
+                on_complete=on_complete,
+                on_complete_kwargs=on_complete_kwargs,
+                poll_schedule=poll_schedule,
+            )
+        return futures
+
+
     def ama(self, job_id: str, prompts: List[str]) -> Dict[str, Any]:
         """
         Create and send a request for an AMA job.
@@ -295,68 +652,147 @@ class VoiceAI:
             "prompts": prompts
         }
 
-        sess = self._get_session()
-        r = sess.post(url, headers=hdrs, json=data)
+        r = self._request('POST', url, headers=hdrs, json=data)
         resp = utils.get_json_resp(r)
         return resp
 
 
+    def ama_many(
+        self,
+        items: Iterable[Union[str, tuple, bulk.TranscribeResult]],
+        prompts: Optional[List[str]] = None,
+        max_workers: int = 8,
+        rate: Optional[Union[float, RateLimiter]] = None,
+    ) -> Iterator[bulk.AMAResult]:
+        """
+        Run AMA over many transcripts with bounded concurrency and an optional
+        rate limit. Results are yielded as each request completes.\n
+        Chained on `transcribe_many`, AMA starts on each transcript as soon as
+        its job completes:
+        ```
+        done = vai.transcribe_many(files, config)
+        for res in vai.ama_many(done, prompts=['Summarize the call.']):
+            print(res.job_id, res.error or res.result)
+        ```
+
+        Parameters
+        ----------
+        items: iterable
+            Job ids, `(job_id, prompts)` pairs, or `TranscribeResult`s.
+            Consumed lazily on a background thread, so it can be a generator.
+        prompts: List[str], optional
+            Prompts for items that do not come with their own.
+        max_workers: int
+            Number of concurrent requests (and pooled connections).
+        rate: float or RateLimiter, optional
+            Most requests started per second, or a `RateLimiter` shared with
+            other work.
+
+        Returns
+        -------
+        results: Iterator[AMAResult]
+            One `(index, job_id, prompts, result, error)` tuple per item.\n
+            Failures, including failed transcriptions, are reported through
+            `error` instead of being raised.
+        """
+        if isinstance(rate, (int, float)):
+            rate = RateLimiter(rate)
+        self._ensure_pool_size(max_workers)
+        return bulk.ama_many(self, items, prompts=prompts, max_workers=max_workers, limiter=rate)
+
+
     def _get_short_lived_token(self, timeout):
-        url = f'{K.FULL_TOKEN_URL}?duration={timeout}'
+        url = utils.token_url(timeout)
         hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs)
+        r = self._request('GET', url, headers=hdrs)
         resp = utils.get_json_resp(r)
         token = resp[K.k_data][K.k_token]
         return token
 
 
     def _resolve_config(self, config):
-        cfg = {}
-        if isinstance(config, (str, Path)):
-            if os.path.exists(config):
-                with open(config) as fp:
-                    cfg = json.load(fp)
-            else:
-                try:
-                    cfg = json.loads(config)
-                except:
-                    raise ValueError(f'Could not parse provided JSON config: {config}')
-        elif isinstance(config, io.IOBase):
-            cfg = json.load(config)
+        return utils.resolve_config(config)
+
+
+    def _submit(self, file, job_config, on_progress=None, trim_silence=False):
+        '''
+        Create a job, trimming silence first if asked to. Returns the job id.\n
+        With a `Deduplicator`, files submitted before with the same config
+        return the earlier job id instead of being uploaded again.
+        '''
+        key = None
+        if self._dedup is not None:
+            key = self._dedup.key(file, job_config, trim_silence=trim_silence)
+        if key is None:
+            job_id, offsets = self._upload(file, job_config, on_progress, trim_silence)
         else:
-            cfg = config
+            job_id, offsets, _ = self._dedup.submit(
+                key,
+                lambda: self._upload(file, job_config, on_progress, trim_silence),
+                check=self._job_reusable,
+            )
+        if offsets is not None:
+            self._offset_maps[job_id] = OffsetMap(offsets)
+        if self._metrics is not None:
+            self._metrics.job_submitted(job_id)
+        if self._job_store is not None:
+            label = str(file) if isinstance(file, (str, Path)) else None
+            self._job_store.add(job_id, file=label, config=job_config, offsets=offsets)
+        return job_id
 
-        if not isinstance(cfg, dict):
-            raise ValueError(f'Invalid type for config: {type(cfg)}')
-        return cfg
 
+    def _upload(self, file, job_config, on_progress=None, trim_silence=False):
+        '''
+        Returns the job id and the offset map segments, if silence was trimmed.
+        '''
+        offsets = None
+        filename = None
+        if trim_silence:
+            trimmer = trim_silence if isinstance(trim_silence, SilenceTrimmer) else SilenceTrimmer()
+            trimmed = trimmer.trim_file(file)
+            if trimmed is not None:
+                # keep the original name for the job, the content is now in memory
+                filename = utils.get_filename(file)
+                file, offset_map = trimmed
+                offsets = offset_map.segments
+        resp = self._create_transcribe_job(file, job_config, on_progress=on_progress, filename=filename)
+        return resp[K.k_data][K.k_job_id], offsets
 
-    def _poll_and_call(self, job_id, on_complete=None, on_complete_kwargs={}, poll_schedule=None):
-        result = self.poll_until_complete(job_id, poll_schedule=poll_schedule)
-        on_complete(result, **on_complete_kwargs)
 
+    def _job_reusable(self, job_id):
+        '''
+        Whether an earlier job still exists and did not fail.\n
+        Only a 404 or a failed status rule it out; other errors, e.g. a 503
+        left after retries, are raised rather than taken as a lost job.
+        '''
+        r = self._request('GET', utils.job_url(job_id), headers=self._create_headers())
+        if r.status_code == 404:
+            return False
+        return not utils.is_failed(utils.get_json_resp(r))
 
-    def _create_transcribe_job(self, file, job_config):
-        sess = self._get_session()
+
+    def _create_transcribe_job(self, file, job_config, on_progress=None, filename=None):
         hdrs = self._create_headers()
-        file_data = utils.create_formdata_file(file)
+        file_data = utils.create_formdata_stream(file, name=filename)
         files = {
             K.k_files: file_data,
         }
         data = {
             K.k_config: json.dumps(job_config),
         }
-        r = sess.post(K.FULL_JOBS_URL, headers=hdrs, data=data, files=files)
+        body = MultipartEncoder(data, files, on_progress=on_progress)
+        hdrs['Content-Type'] = body.content_type
+        try:
+            # without a known size, a generator makes requests use chunked encoding
+            r = self._request('POST', K.FULL_JOBS_URL, headers=hdrs, data=body if body.len is not None else iter(body))
+        finally:
+            body.close()
         resp = utils.get_json_resp(r)
         return resp
 
 
     def _create_headers(self):
-        hdrs = {
-            'Authorization': self._api_key,
-        }
-        return hdrs
+        return utils.create_headers(self._api_key)
 
     def synthesize(
             self,
@@ -366,36 +802,211 @@ class VoiceAI:
         Text to speech.
         '''
         data = self._resolve_config(data)
-        sess = self._get_session()
+        if data['stream'] == True and self._tts_cache is not None:
+            return self._tts_cache.fetch(self._tts_cache.key(data), self._synthesize_audio, data)
         hdrs = self._create_headers()
-        r = sess.post(K.FULL_TTS_URL, headers=hdrs, json=data)
+        r = self._request('POST', K.FULL_TTS_URL, headers=hdrs, json=data)
         if data['stream'] == False:
             return utils.get_json_resp(r) 
         if data['stream'] == True:
             return r.content
-    
+
+    def _synthesize_audio(self, data):
+        hdrs = self._create_headers()
+        r = self._request('POST', K.FULL_TTS_URL, headers=hdrs, json=data)
+        if r.status_code != 200:
+            # never cache an error response as audio
+            utils.get_json_resp(r)
+        return r.content
+
+    def synthesize_stream(
+            self,
+            data: Union[Dict[str, Any], str, Path, io.IOBase],
+            sink=None,
+            chunk_size: int = TTS_CHUNK_SIZE,
+            ) -> SynthesisStream:
+        '''
+        Text to speech, streamed: audio chunks are handed over as they arrive
+        instead of after the whole response was downloaded.
+        ```
+        with vai.synthesize_stream(data) as audio:
+            for chunk in audio:
+                player.write(chunk)
+        print(f'first byte after {audio.ttfb:.3f}s')
+        ```
+
+        Parameters
+        ----------
+        data: dict, str, Path or io.IOBase
+            TTS job config, as for `synthesize`. `stream` is always set.
+        sink: str, Path, binary file object, or socket, optional
+            Write the audio straight to `sink` before returning.
+        chunk_size: int
+            Largest chunk yielded, in bytes.
+
+        Returns
+        -------
+        audio: SynthesisStream
+            Iterator of audio chunks, with `ttfb` (seconds until the first
+            byte), `elapsed` and `bytes_received` filled in as it is read.
+            Already read to the end and closed when `sink` is given.
+        '''
+        data = dict(self._resolve_config(data), stream=True)
+        started = time.monotonic()
+        if self._tts_cache is not None:
+            # read into the cache on a background thread, and shared with
+            # other callers synthesizing the same prompt meanwhile
+            source = self._tts_cache.stream(self._tts_cache.key(data), lambda: self._open_synthesis(data))
+        else:
+            source = self._open_synthesis(data)
+        audio = SynthesisStream(source, started, chunk_size=chunk_size)
+        if sink is not None:
+            audio.write_to(sink)
+        return audio
+
+    def _open_synthesis(self, data):
+        hdrs = self._create_headers()
+        r = self._request('POST', K.FULL_TTS_URL, headers=hdrs, json=data, stream=True)
+        if r.status_code != 200:
+            try:
+                utils.get_json_resp(r)
+            finally:
+                r.close()
+        return r
+
+    def synthesize_many(
+            self,
+            items: Iterable[Union[Dict[str, Any], tuple]],
+            out_dir: Optional[Union[str, Path]] = None,
+            max_workers: int = 8,
+            ordered: bool = True,
+            on_progress: Optional[Callable[[bulk.SynthesisProgress], None]] = None,
+            ) -> bulk.SynthesisBatch:
+        '''
+        Synthesize many TTS requests with bounded concurrency over the shared session.
+        ```
+        batch = vai.synthesize_many(prompts, out_dir='prompts', max_workers=16)
+        for res in batch:
+            if res.error is not None:
+                print(f'{res.name} failed: {res.error}')
+        print(batch.summary())
+        ```
+
+        Parameters
+        ----------
+        items: iterable of dict, or of (name, dict) tuples
+            TTS job configs, as for `synthesize`. Consumed lazily, so it can
+            be a generator. `stream` is always set.
+        out_dir: str or Path, optional
+            Write each item's audio to `out_dir/name` instead of returning it.
+            Items without a name are written to `<index>.wav`.
+        max_workers: int
+            Number of concurrent requests (and pooled connections).
+        ordered: bool
+            Yield results in input order, or as soon as each one completes.
+        on_progress: callback, optional
+            Called with a `SynthesisProgress(completed, failed, elapsed, items_per_second)`
+            after every item.
+
+        Returns
+        -------
+        results: SynthesisBatch
+            Iterator of `SynthesisResult(index, name, data, audio, path, error)`.\n
+            Failures are reported through `error` instead of being raised, and
+            are collected in `summary()`.
+        '''
+        self._ensure_pool_size(max_workers)
+        return bulk.SynthesisBatch(
+            self,
+            items,
+            out_dir=out_dir,
+            max_workers=max_workers,
+            ordered=ordered,
+            on_progress=on_progress,
+        )
+
     def get_tts_job_status(self, job_id: str) -> Dict[str, Any]:
-        url = f'{K.FULL_TTS_URL.rstrip("/")}/{job_id}'
+        url = utils.tts_job_url(job_id)
         hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs)
+        r = self._request('GET', url, headers=hdrs)
         return utils.get_json_resp(r)
     
     def get_tts_jobs(self, query_params: Union[Dict[str, Any], str, Path, io.IOBase]) -> Dict[str, Any]:
-        url = f'{K.FULL_TTS_URL.rstrip("/")}'
+        url = utils.tts_job_url()
         query_params = self._resolve_config(query_params)
         hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.get(url, headers=hdrs, params=query_params)
+        r = self._request('GET', url, headers=hdrs, params=query_params)
         return utils.get_json_resp(r)
     
+    def iter_tts_jobs(
+            self,
+            query_params: Optional[Union[Dict[str, Any], str, Path, io.IOBase]] = None,
+            page_size: int = 100,
+            prefetch: bool = True,
+            ) -> Iterator[Dict[str, Any]]:
+        '''
+        Iterate over all TTS jobs, one record at a time, across as many pages as needed.\n
+        The next page is fetched in the background while the current one is
+        being consumed, and earlier pages are not kept in memory.
+        ```
+        for job in vai.iter_tts_jobs({'sort': 'asc'}):
+            print(job['jobId'], job['status'])
+        ```
+
+        Parameters
+        ----------
+        query_params: dict, str, Path or io.IOBase, optional
+            Filters and sorting, as for `get_tts_jobs`. `pageNumber` sets
+            the first page, `pageSize` overrides `page_size`.
+        page_size: int
+            Number of jobs fetched per request.
+        prefetch: bool
+            Fetch the next page while the current one is consumed.
+        '''
+        params = self._resolve_config(query_params) if query_params is not None else {}
+        page_size = int(params.pop('pageSize', page_size))
+        start_page = int(params.pop('pageNumber', 1))
+
+        def fetch_page(number):
+            resp = self.get_tts_jobs(dict(params, pageNumber=number, pageSize=page_size))
+            data = resp[K.k_data]
+            return data.get('jobs') or [], data.get('total')
+
+        return bulk.paginate(fetch_page, start_page=start_page, page_size=page_size, prefetch=prefetch)
+
     def delete_tts_job(self, job_id: str) -> Dict[str, Any]:
-        url = f'{K.FULL_TTS_URL.rstrip("/")}/{job_id}'
+        url = utils.tts_job_url(job_id)
         hdrs = self._create_headers()
-        sess = self._get_session()
-        r = sess.delete(url, headers=hdrs)
+        r = self._request('DELETE', url, headers=hdrs)
         return utils.get_json_resp(r)
 
+    def delete_tts_jobs(self, job_ids: Iterable[str], max_workers: int = 8) -> Dict[str, Any]:
+        '''
+        Delete many TTS jobs concurrently, with `delete_tts_job`.\n
+        ```
+        old = (job['jobId'] for job in vai.iter_tts_jobs() if job['timestamp'] < cutoff)
+        results = vai.delete_tts_jobs(old, max_workers=16)
+        failed = {job_id: e for job_id, e in results.items() if isinstance(e, Exception)}
+        ```
+
+        Parameters
+        ----------
+        job_ids: iterable of str
+            Consumed lazily, so it can be a generator such as `iter_tts_jobs`.
+        max_workers: int
+            Number of concurrent requests (and pooled connections).
+
+        Returns
+        -------
+        results: dict
+            Job id to the server's response, or to the exception raised for that job.
+        '''
+        self._ensure_pool_size(max_workers)
+        return {
+            job_id: result if error is None else error
+            for job_id, result, error in bulk.fan_out(self.delete_tts_job, job_ids, max_workers=max_workers)
+        }
+
     def create_custom_dict(self, name: str, words: List[str]) -> Dict[str, Any]:
         '''
         Create a dictionary of custom words for vocab adaptation.
@@ -412,14 +1023,15 @@ class VoiceAI:
         result: dict
             Contains the id of the newly created custom dictionary
         '''
-        sess = self._get_session()
         headers = self._create_headers()
         data = {
             "name": name,
             "words": words
         }
-        r = sess.post(K.FULL_VOCAB_ADAPT_URL, headers=headers, json=data)
+        r = self._request('POST', utils.dict_url(), headers=headers, json=data)
         resp = utils.get_json_resp(r)
+        if self._cache is not None:
+            self._cache.invalidate('custom_dicts')
         return resp
 
     def get_custom_dicts(self) -> Dict[str, Any]:
@@ -431,10 +1043,7 @@ class VoiceAI:
             result: dict
                 Contains the list of custom dictionaries created by the user.
         '''
-        sess = self._get_session()
-        headers = self._create_headers()
-        r = sess.get(K.FULL_VOCAB_ADAPT_URL, headers=headers)
-        resp = utils.get_json_resp(r)
+        resp = self._get_catalog(('custom_dicts',), utils.dict_url())
         return resp
     
     def get_custom_dict(self, dict_id: str) -> Dict[str, Any]:
@@ -451,10 +1060,7 @@ class VoiceAI:
             result: dict
                 Contains the details like id, name and words the the custom dictionary.
         '''
-        sess = self._get_session()
-        headers = self._create_headers()
-        r = sess.get(f'{K.FULL_VOCAB_ADAPT_URL}/{dict_id}', headers=headers)
-        resp = utils.get_json_resp(r)
+        resp = self._get_catalog(('custom_dict', dict_id), utils.dict_url(dict_id))
         return resp
     
     def update_custom_dict(self, dict_id: str, op: str, words: List[str]) -> Dict[str, Any]:
@@ -478,12 +1084,123 @@ class VoiceAI:
             result: dict
                 contains the message of the operation performed on the custom dictionary.
         '''
-        sess = self._get_session()
         headers = self._create_headers()
         data = {
             "op": op,
             "words": words
         }
-        r = sess.patch(f'{K.FULL_VOCAB_ADAPT_URL}/{dict_id}', headers=headers, json=data)
-        resp = utils.get_json_resp(r)
+        try:
+            r = self._request('PATCH', utils.dict_url(dict_id), headers=headers, json=data)
+            resp = utils.get_json_resp(r)
+        finally:
+            # even a failed update may have been applied, so never keep the old words
+            if self._cache is not None:
+                self._cache.invalidate('custom_dict', dict_id)
+                self._cache.invalidate('custom_dicts')
         return resp
+
+
+    def sync_custom_dict(
+        self,
+        name: str,
+        words: Iterable[str],
+        batch_size: int = dict_sync.BATCH_SIZE,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        '''
+        Make the custom dictionary `name` contain exactly `words`, creating it
+        if needed, while sending only what changed.\n
+        The current words are fetched once and diffed locally; additions and
+        removals are sent as PATCH requests of at most `batch_size` words.
+        A fingerprint of the last synced words is kept under `NS_HOME`, so
+        syncing unchanged words makes no request at all.
+
+        Parameters
+        ----------
+        name: str
+            Name of the custom dictionary
+        words: iterable of str
+            Every word the dictionary should contain.
+        batch_size: int
+            Most words sent in one request.
+        force: bool
+            Compare against the server even if the fingerprint matches,
+            e.g. after the dictionary was edited elsewhere.
+
+        Returns
+        -------
+        result: dict
+            `id` of the dictionary, number of words `added` and `removed`,
+            and number of `requests` made.
+        '''
+        words = dict_sync.unique(words)
+        fp = dict_sync.fingerprint(words)
+        known = self._dict_state.get(name)
+        if known is not None and known['fingerprint'] == fp and not force:
+            return {'id': known['id'], 'added': 0, 'removed': 0, 'requests': 0}
+
+        requests_made = 0
+        dict_id = known['id'] if known is not None else None
+        current = None
+        if dict_id is not None:
+            current = self._fetch_custom_dict_words(dict_id)
+            requests_made += 1
+        if current is None:
+            dict_id = self._find_custom_dict(name)
+            requests_made += 1
+            if dict_id is not None:
+                current = self._fetch_custom_dict_words(dict_id)
+                requests_made += 1
+
+        if current is None:
+            chunks = dict_sync.batches(words, batch_size)
+            first = next(chunks, [])
+            resp = self.create_custom_dict(name, first)
+            requests_made += 1
+            dict_id = resp[K.k_data][K.k_dict_id]
+            added, removed = words[len(first):], []
+        else:
+            have = set(current)
+            want = set(words)
+            added = [w for w in words if w not in have]
+            removed = [w for w in current if w not in want]
+
+        for op, diff in (('remove', removed), ('add', added)):
+            for chunk in dict_sync.batches(diff, batch_size):
+                self.update_custom_dict(dict_id, op, chunk)
+                requests_made += 1
+
+        self._dict_state.set(name, dict_id, fp)
+        n_added = len(words) if current is None else len(added)
+        return {'id': dict_id, 'added': n_added, 'removed': len(removed), 'requests': requests_made}
+
+
+    def _fetch_custom_dict_words(self, dict_id):
+        '''
+        Words of a custom dictionary, straight from the server, or None if it does not exist.
+        '''
+        r = self._request('GET', utils.dict_url(dict_id), headers=self._create_headers())
+        if r.status_code == 404:
+            return None
+        resp = utils.get_json_resp(r)
+        return resp[K.k_data].get(K.k_words) or []
+
+
+    def _find_custom_dict(self, name):
+        r = self._request('GET', utils.dict_url(), headers=self._create_headers())
+        resp = utils.get_json_resp(r)
+        for d in resp[K.k_data]:
+            if d.get('name') == name:
+                return d[K.k_dict_id]
+        return None
+
+
+def _chunked(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield tuple(batch)
+            batch = []
+    if batch:
+        yield tuple(batch)
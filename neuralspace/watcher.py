@@ -0,0 +1,174 @@
+import time
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from neuralspace import utils
+
+
+_Watch = namedtuple(
+    '_Watch', ['job_id', 'schedule', 'on_complete', 'on_complete_kwargs', 'future']
+)
+
+
+class JobWatcher:
+
+
+    def __init__(self, vai, batch_size: int = 8, max_callback_workers: int = 4):
+        '''
+        Polls many transcription jobs from a single scheduler thread.\n
+        Jobs are kept in a priority queue ordered by their next poll deadline.
+        Whenever jobs fall due, they are checked together with at most
+        `batch_size` concurrent status requests, and completion callbacks run
+        on a pool of `max_callback_workers` threads. The number of threads is
+        therefore fixed, no matter how many jobs are being watched.
+
+        Parameters
+        ----------
+        vai: VoiceAI
+            Client used to fetch job statuses.
+        batch_size: int
+            Maximum number of concurrent status requests.
+        max_callback_workers: int
+            Maximum number of callbacks running at once.
+        '''
+        self._vai = vai
+        self._cond = threading.Condition()
+        # (deadline, seq, _Watch)
+        self._due = []
+        self._seq = itertools.count()
+        self._polling = 0
+        self._thread = None
+        self._closed = False
+        self._poll_executor = ThreadPoolExecutor(
+            max_workers=batch_size, thread_name_prefix='ns-watcher-poll'
+        )
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=max_callback_workers, thread_name_prefix='ns-watcher-callback'
+        )
+
+
+    def __len__(self):
+        with self._cond:
+            return len(self._due) + self._polling
+
+
+    def watch(self, job_id, on_complete=None, on_complete_kwargs=None, poll_schedule=None) -> Future:
+        '''
+        Start watching a job.
+
+        Parameters
+        ----------
+        job_id: str
+            The id of the transcription job.
+        on_complete: callback, optional
+            Called as `on_complete(result, **on_complete_kwargs)` once the job completes.
+        on_complete_kwargs: dict, optional
+            Passed as **kwargs to on_complete.
+        poll_schedule: List[float], optional
+            Sleep times between polls. See `VoiceAI.transcribe`.
+
+        Returns
+        -------
+        future: concurrent.futures.Future
+            Resolves to the completed job status after `on_complete` returns,
+            or to the exception raised while polling or by the callback.
+            A job that fails on the server resolves to a `ValueError`,
+            without calling `on_complete`.
+        '''
+        if on_complete_kwargs is None:
+            on_complete_kwargs = {}
+        fut = Future()
+        w = _Watch(job_id, utils.iter_poll_schedule(poll_schedule), on_complete, on_complete_kwargs, fut)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('JobWatcher is closed')
+            heapq.heappush(self._due, (time.monotonic(), next(self._seq), w))
+            if self._thread is None:
+                # non-daemon, like the per-job threads it replaces, so pending
+                # callbacks still run before the interpreter exits
+                self._thread = threading.Thread(target=self._run, name='ns-watcher')
+                self._thread.start()
+            self._cond.notify()
+        return fut
+
+
+    def close(self, wait: bool = True):
+        '''
+        Stop the scheduler and cancel all jobs still being watched.
+        '''
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+            pending = [w for _, _, w in self._due]
+            self._due = []
+            self._cond.notify()
+        for w in pending:
+            w.future.cancel()
+        if wait and thread is not None:
+            thread.join()
+        self._poll_executor.shutdown(wait=wait)
+        self._callback_executor.shutdown(wait=wait)
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed or not self._due:
+                        # exit when idle; the next watch() starts a new thread
+                        self._thread = None
+                        return
+                    timeout = self._due[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                batch = []
+                now = time.monotonic()
+                while self._due and self._due[0][0] <= now:
+                    batch.append(heapq.heappop(self._due)[2])
+                self._polling = len(batch)
+
+            futs = {
+                self._poll_executor.submit(self._vai.get_job_status, w.job_id): w
+                for w in batch
+            }
+            requeue = []
+            for f in as_completed(futs):
+                w = futs[f]
+                try:
+                    result = f.result()
+                except Exception as e:
+                    w.future.set_exception(e)
+                    continue
+                if utils.is_completed(result):
+                    try:
+                        self._callback_executor.submit(self._dispatch, w, result)
+                    except RuntimeError:
+                        # closed without waiting
+                        w.future.cancel()
+                elif utils.is_failed(result):
+                    w.future.set_exception(ValueError(f'Job {w.job_id} failed'))
+                else:
+                    requeue.append(w)
+
+            with self._cond:
+                now = time.monotonic()
+                for w in requeue:
+                    if self._closed:
+                        w.future.cancel()
+                    else:
+                        heapq.heappush(self._due, (now + next(w.schedule), next(self._seq), w))
+                self._polling = 0
+
+
+    def _dispatch(self, w, result):
+        try:
+            if w.on_complete is not None:
+                w.on_complete(result, **w.on_complete_kwargs)
+        except Exception as e:
+            w.future.set_exception(e)
+        else:
+            w.future.set_result(result)
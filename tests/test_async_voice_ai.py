@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from neuralspace import constants as K
+from neuralspace.async_voice_ai import AsyncVoiceAI
+from neuralspace.benchmark.server import FakeServer
+
+
+TTS = {'text': 'hello', 'voice_id': 'en-female-1', 'stream': True}
+
+
+@pytest.fixture
+def server():
+    base_url = K.BASE_URL
+    with FakeServer(tts_bytes=1000) as server:
+        K.set_base_url(server.url)
+        try:
+            yield server
+        finally:
+            K.set_base_url(base_url)
+
+
+def _synthesize(data):
+    async def run():
+        async with AsyncVoiceAI(api_key='test') as vai:
+            return await vai.synthesize(data)
+
+    return asyncio.run(run())
+
+
+def test_synthesize_stream_returns_audio(server):
+    assert _synthesize(TTS) == b'\0' * 1000
+
+
+def test_synthesize_stream_raises_on_error_response(server):
+    server.error_rate = 1.0
+    server.error_status = 400
+    with pytest.raises(ValueError, match='400'):
+        _synthesize(TTS)
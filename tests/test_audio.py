@@ -0,0 +1,18 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from neuralspace import audio
+
+
+@pytest.mark.parametrize('length', [1, 10, 62, 63, 64, 1000])
+def test_lowpass_keeps_length(length):
+    x = np.ones(length, dtype=np.float32)
+    assert len(audio._lowpass(x, 0.5)) == length
+
+
+@pytest.mark.parametrize('length', [1, 10, 30, 100])
+def test_resample_short_input(length):
+    x = np.ones(length, dtype=np.float32)
+    assert len(audio.resample(x, 48000, 16000)) == len(range(0, length, 3))
+    assert len(audio.resample(x, 44100, 16000)) == int(round(length * 16000 / 44100))
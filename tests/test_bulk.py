@@ -0,0 +1,44 @@
+from neuralspace import bulk
+from neuralspace import constants as K
+
+
+class _StubVoiceAI:
+    '''
+    Jobs named after their file, completing or failing on the second poll.
+    '''
+
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.polls = {}
+
+
+    def _submit(self, file, config, trim_silence=False):
+        return f'job-{file}'
+
+
+    def get_job_status(self, job_id):
+        self.polls[job_id] = self.polls.get(job_id, 0) + 1
+        if self.polls[job_id] < 2:
+            status = 'Queued'
+        elif job_id[len('job-'):] in self.failing:
+            status = 'Failed'
+        else:
+            status = 'Completed'
+        return {K.k_data: {K.k_job_id: job_id, K.k_status: status}}
+
+
+def test_transcribe_many_reports_failed_jobs():
+    vai = _StubVoiceAI(failing=['b.wav'])
+    results = {
+        r.file: r for r in bulk.transcribe_many(vai, ['a.wav', 'b.wav', 'c.wav'], {}, poll_schedule=[0.01])
+    }
+    assert sorted(results) == ['a.wav', 'b.wav', 'c.wav']
+    assert results['a.wav'].error is None
+    assert results['c.wav'].error is None
+    failed = results['b.wav']
+    assert isinstance(failed.error, ValueError)
+    assert failed.job_id == 'job-b.wav'
+    assert failed.result[K.k_data][K.k_status] == 'Failed'
+    # a failed job is not polled again
+    assert vai.polls['job-b.wav'] == 2